@@ -0,0 +1,270 @@
+"""性能基准测试
+
+无界面运行（Qt使用offscreen平台），测量以下热点路径的耗时：
+    - 各曲线类型在不同点数下的生成：引擎计算(compute_curve)和界面的generate_curve（含同步重绘）
+    - C数组文本的解析(parse_c_array)与导出(export_array)
+    - plot_array的完整重绘：重建图元和只更新数据两种情况
+    - 通过on_mouse_move模拟的拖动，每帧包括合并后的刷新
+结果写成JSON报告，便于在不同版本之间对比:
+    python benchmark.py                          # 结果写入bench_output.json
+    python benchmark.py --quick --only drag,plot
+    python benchmark.py --compare old.json -o new.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from unittest import mock
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import matplotlib
+import numpy as np
+from matplotlib.backend_bases import MouseEvent
+from PyQt5.QtCore import PYQT_VERSION_STR
+from PyQt5.QtWidgets import QApplication, QFileDialog, QMessageBox
+
+import c_array
+import curve_engine
+import motion_profile
+import stepper_curve_generator as gui
+
+# 报告格式版本，字段不兼容地修改时加1
+REPORT_VERSION = 1
+
+# 默认的报告文件
+DEFAULT_OUTPUT = "bench_output.json"
+
+# 测试的点数，--quick时只用前两档
+SIZES = [98, 10000, 1000000]
+QUICK_SIZES = [98, 10000]
+
+# 每项默认重复的次数，以及拖动测试的帧数
+DEFAULT_REPEAT = 5
+DRAG_FRAMES = 60
+
+# 对比时中位数变化超过该比例才标出
+COMPARE_THRESHOLD = 0.10
+
+# 测试分组
+GROUPS = ["generate", "parse", "export", "plot", "drag"]
+
+
+def summarize(times):
+    """每次耗时(ms)的统计"""
+    times = sorted(times)
+    return {
+        "unit": "ms",
+        "n": len(times),
+        "min": times[0],
+        "median": statistics.median(times),
+        "mean": statistics.mean(times),
+        "p95": times[int(round(0.95 * (len(times) - 1)))],
+        "max": times[-1],
+    }
+
+
+def git_revision():
+    """当前代码的git版本，不在git仓库中时返回None"""
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+class Benchmark:
+    """在一个离屏主窗口上依次运行各组测试，结果按名称收集"""
+
+    def __init__(self, sizes, repeat):
+        self.sizes = sizes
+        self.repeat = repeat
+        self.results = {}
+        self.window = gui.StepperCurveGenerator()
+        self.window.resize(1200, 800)
+        self.window.show()
+        # 实时预览会在参数变化时异步生成，测试中关闭，只测量显式的调用
+        self.window.live_preview_check.setChecked(False)
+        QApplication.processEvents()
+
+    def run(self, name, func, setup=None):
+        """调用func共repeat次，记录每次的耗时；setup在每次调用前执行，不计入耗时"""
+        times = []
+        for _ in range(self.repeat):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            func()
+            times.append((time.perf_counter() - start) * 1000)
+        self.record(name, times)
+
+    def record(self, name, times):
+        self.results[name] = summarize(times)
+        print(f"{name:48s} 中位数 {self.results[name]['median']:10.3f} ms", flush=True)
+
+    def load(self, curve_type, n_points):
+        """按曲线类型和点数生成当前数组并完整绘制一次"""
+        self.window.curve_type.setCurrentText(curve_type)
+        self.window.points_spin.setValue(n_points)
+        self.window.generate_curve()
+        self.window.canvas.draw()
+
+    def redraw(self):
+        """plot_array之后同步绘制，计入真实的渲染耗时"""
+        self.window.plot_array(self.window.current_array)
+        self.window.canvas.draw()
+
+    def bench_generate(self):
+        curve_types = curve_engine.CURVE_TYPES + motion_profile.PROFILE_TYPES
+        for curve_type in curve_types:
+            for n in self.sizes:
+                self.window.curve_type.setCurrentText(curve_type)
+                self.window.points_spin.setValue(n)
+                params = self.window.generation_params()
+                self.run(f"generate.engine[{curve_type},{n}]", lambda: gui.compute_curve(params))
+
+                def generate():
+                    self.window.generate_curve()
+                    self.window.canvas.draw()
+
+                # 清空结果缓存，测量完整的生成过程
+                self.run(f"generate.gui[{curve_type},{n}]", generate, self.window.generation_cache.clear)
+
+    def bench_parse(self):
+        for n in self.sizes:
+            text = c_array.format_c_array(curve_engine.generate("S型", n, 93, 8), "Bench")
+            self.run(f"parse.c_arrays[{n}]", lambda: c_array.parse_c_arrays(text))
+            self.run(f"parse.gui[{n}]", lambda: self.window.parse_c_array(text))
+
+    def bench_export(self):
+        with mock.patch.object(QMessageBox, "information"), tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.h")
+            with mock.patch.object(QFileDialog, "getSaveFileName", return_value=(path, "")):
+                for n in self.sizes:
+                    self.load("S型", n)
+                    # 超过EXPORT_TEXT_LIMIT的数组直接写入文件，其余写入文本框
+                    self.run(f"export.gui[{n}]", self.window.export_array)
+
+    def bench_plot(self):
+        for n in self.sizes:
+            self.load("S型", n)
+
+            def invalidate():
+                self.window.plot_signature = None
+
+            self.run(f"plot.rebuild[{n}]", self.redraw, invalidate)
+            self.run(f"plot.refresh[{n}]", self.redraw)
+
+    def post(self, name, x, y, button=1):
+        """在数据坐标(x, y)处发出一个鼠标事件，经由画布的回调分发"""
+        px, py = self.window.ax.transData.transform((x, y))
+        self.window.canvas.callbacks.process(name, MouseEvent(name, self.window.canvas, px, py, button=button))
+
+    def bench_drag(self):
+        for n in self.sizes:
+            self.load("S型", n)
+            x = n // 2
+            self.post("button_press_event", x, 60)
+            times = []
+            for i in range(DRAG_FRAMES):
+                start = time.perf_counter()
+                # 一帧内有两次移动事件，由定时器合并为一次刷新，这里直接调用刷新函数，
+                # 再处理事件队列，让draw_idle推迟的重绘和blit后的绘制也计入本帧
+                self.post("motion_notify_event", x, 30 + i % 40)
+                self.post("motion_notify_event", x, 30.5 + i % 40)
+                self.window.flush_pending_updates()
+                QApplication.processEvents()
+                times.append((time.perf_counter() - start) * 1000)
+            self.post("button_release_event", x, 60)
+            self.record(f"drag.frame[{n}]", times)
+
+    def report(self):
+        return {
+            "version": REPORT_VERSION,
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "environment": {
+                "revision": git_revision(),
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "matplotlib": matplotlib.__version__,
+                "pyqt": PYQT_VERSION_STR,
+                "platform": platform.platform(),
+            },
+            "sizes": self.sizes,
+            "repeat": self.repeat,
+            "results": self.results,
+        }
+
+
+def compare(old, new, threshold=COMPARE_THRESHOLD):
+    """按中位数对比两份报告，返回输出的文本行"""
+    lines = [f"{'测试项':48s} {'旧(ms)':>10s} {'新(ms)':>10s} {'比值':>7s}"]
+    for name, result in new["results"].items():
+        if name not in old["results"]:
+            continue
+        before, after = old["results"][name]["median"], result["median"]
+        ratio = after / before if before > 0 else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  变慢"
+        elif ratio < 1 - threshold:
+            flag = "  变快"
+        lines.append(f"{name:48s} {before:10.3f} {after:10.3f} {ratio:7.2f}{flag}")
+    return lines
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="无界面运行性能基准测试，结果写成JSON报告")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT, help="报告文件")
+    parser.add_argument("--quick", action="store_true", help=f"只测试{QUICK_SIZES}点，用于快速检查")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="每项重复的次数")
+    parser.add_argument("--only", default=",".join(GROUPS), help=f"只运行指定的分组，逗号分隔: {','.join(GROUPS)}")
+    parser.add_argument("--compare", metavar="OLD", help="与之前的报告按中位数对比")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    groups = [g.strip() for g in args.only.split(",") if g.strip()]
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        print(f"错误: 未知的分组: {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 1
+    if args.repeat < 1:
+        print("错误: 重复次数必须大于0", file=sys.stderr)
+        return 1
+    old = None
+    if args.compare:
+        try:
+            with open(args.compare, encoding="utf-8") as f:
+                old = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"错误: 无法读取报告 {args.compare}: {e}", file=sys.stderr)
+            return 1
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    bench = Benchmark(QUICK_SIZES if args.quick else SIZES, args.repeat)
+    for group in GROUPS:
+        if group in groups:
+            getattr(bench, f"bench_{group}")()
+    bench.window.close()
+
+    report = bench.report()
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"报告已写入 {args.output}")
+    if old is not None:
+        print("\n".join(compare(old, report)))
+    app.quit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
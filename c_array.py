@@ -0,0 +1,443 @@
+"""C数组文本的解析与格式化
+
+不依赖Qt，图形界面和命令行工具共用。
+"""
+import io
+import re
+import warnings
+from collections import namedtuple
+
+import numpy as np
+
+# 解析得到的一个数组：名称、元素类型（匿名数组为None）和数值
+CArray = namedtuple("CArray", ["name", "ctype", "values"])
+
+# 字符串/字符常量与注释：注释替换为空格，字符串清空内容，字符常量替换为其数值，
+# 其中的花括号、逗号和分号不会影响后面的扫描
+_COMMENT_RE = re.compile(r'"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'|//[^\n]*|/\*.*?\*/', re.S)
+
+# 预处理指令（支持反斜杠续行）
+_PREPROCESSOR_RE = re.compile(r'^[ \t]*#(?:[^\n]*\\\n)*[^\n]*', re.M)
+_DEFINE_RE = re.compile(r'#\s*define\s+([A-Za-z_]\w*)[ \t]+(.+)', re.S)
+
+# 数组声明中"["前面的类型和名称，例如 "static const uint16_t Table"
+_DECL_RE = re.compile(r'(?P<ctype>[^=;]*?)\b(?P<name>[A-Za-z_]\w*)\s*$')
+
+# 整数常量（十进制/十六进制/八进制/二进制，可带U/L后缀），可带正负号
+_INT_RE = re.compile(r'([+-]?)\s*(0[xX][0-9a-fA-F]+|0[bB][01]+|\d+)[uUlL]*')
+_FLOAT_RE = re.compile(r'[+-]?(?:\d+\.\d*|\.\d+|\d+)(?:[eE][+-]?\d+)?[fFlL]?')
+
+# 类型转换前缀，例如 "(uint16_t)"
+_CAST_RE = re.compile(r'^\(\s*[A-Za-z_][\w\s]*\**\s*\)\s*')
+
+# 快速路径允许的字符：只有十进制数字、空白、逗号和正负号（以及U/L后缀）
+_FAST_CHARS = str.maketrans("", "", "0123456789,+- \t\r\n")
+_SUFFIX_CHARS = str.maketrans("", "", "uUlL")
+
+# C类型到NumPy类型的对应关系
+_CTYPE_DTYPES = {
+    "int8_t": np.int8, "uint8_t": np.uint8, "int16_t": np.int16, "uint16_t": np.uint16,
+    "int32_t": np.int32, "uint32_t": np.uint32, "int64_t": np.int64, "uint64_t": np.uint64,
+    "char": np.int8, "short": np.int16, "int": np.int64, "long": np.int64,
+    "float": np.float32, "double": np.float64,
+}
+
+
+def _char_value(token):
+    """字符常量的数值，例如 '{' 为123；无法识别的（多字符等）返回None"""
+    try:
+        chars = token[1:-1].encode().decode("unicode_escape")
+    except UnicodeDecodeError:
+        return None
+    return ord(chars) if len(chars) == 1 else None
+
+
+def _strip_comments(text):
+    """去掉注释，清空字符串常量的内容，字符常量替换为数值"""
+    def replace(m):
+        token = m.group(0)
+        if token[0] == '"':
+            return '""'
+        if token[0] == "'":
+            value = _char_value(token)
+            # 无法识别的字符常量保留为''，出现在数组中时由_parse_token报错
+            return "''" if value is None else str(value)
+        return " "
+    return _COMMENT_RE.sub(replace, text)
+
+
+def _collect_macros(text):
+    """收集预处理指令中的#define，返回(宏字典, 去掉预处理行后的文本)"""
+    macros = {}
+
+    def replace(m):
+        d = _DEFINE_RE.match(m.group(0).strip())
+        if d:
+            macros[d.group(1)] = d.group(2).replace("\\\n", " ").strip()
+        return ""
+    return macros, _PREPROCESSOR_RE.sub(replace, text)
+
+
+def _parse_declaration(prefix):
+    """从初始化列表前的文本中取出数组名称和类型，不是数组声明时返回None
+
+    例如 "static const uint16_t Table[98] PROGMEM =" 返回 ("Table", "static const uint16_t")，
+    方括号之后的属性（PROGMEM、__attribute__等）被忽略。
+    """
+    if not prefix.endswith("="):
+        return None
+    bracket = prefix.find("[")
+    if bracket < 0:
+        return None
+    m = _DECL_RE.search(prefix, 0, bracket)
+    if not m or not m.group("ctype").strip():
+        return None
+    return m.group("name"), " ".join(m.group("ctype").split())
+
+
+def _value_dtype(ctype):
+    """根据声明类型选择数值的NumPy类型，未知类型按int64处理"""
+    if not ctype:
+        return np.int64
+    words = ctype.replace("*", " ").split()
+    for word in reversed(words):
+        if word in _CTYPE_DTYPES:
+            dtype = _CTYPE_DTYPES[word]
+            if "unsigned" in words and np.issubdtype(dtype, np.signedinteger):
+                dtype = np.dtype(dtype).str.replace("i", "u")
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def _parse_token(token, macros, is_float, depth=0):
+    """解析单个元素（较慢的通用路径）"""
+    token = token.strip()
+    while token.startswith("(") and _CAST_RE.match(token):
+        token = _CAST_RE.sub("", token, count=1)
+    # 外层括号
+    while token.startswith("(") and token.endswith(")"):
+        token = token[1:-1].strip()
+
+    if token in macros and depth < 16:
+        return _parse_token(macros[token], macros, is_float, depth + 1)
+    if token.startswith("'") and token.endswith("'") and len(token) >= 3:
+        return ord(token[1:-1].encode().decode("unicode_escape"))
+    if is_float and _FLOAT_RE.fullmatch(token):
+        return float(token.rstrip("fFlL"))
+
+    m = _INT_RE.fullmatch(token)
+    if not m:
+        raise ValueError(f"无法解析的数组元素: {token}")
+    sign, digits = m.groups()
+    if digits[:2].lower() in ("0x", "0b"):
+        value = int(digits, 0)
+    elif len(digits) > 1 and digits[0] == "0":
+        # C语言中以0开头的是八进制
+        value = int(digits, 8)
+    else:
+        value = int(digits)
+    return -value if sign == "-" else value
+
+
+def _has_octal(body):
+    """是否有以0开头的多位数（C语言中的八进制），body只含ASCII字符"""
+    chars = np.frombuffer(body.encode("ascii"), dtype=np.uint8)
+    digit = (chars >= ord("0")) & (chars <= ord("9"))
+    # 一个0后面紧跟数字，且前面不是数字
+    lead_zero = (chars[:-1] == ord("0")) & digit[1:]
+    lead_zero[1:] &= ~digit[:-2]
+    return bool(lead_zero.any())
+
+
+def parse_values(body, macros=None, dtype=np.int64):
+    """把初始化列表的内容解析为NumPy数组，嵌套的花括号会被展平"""
+    dtype = np.dtype(dtype)
+    body = body.replace("{", " ").replace("}", " ").strip()
+    # 允许末尾多一个逗号
+    if body.endswith(","):
+        body = body[:-1]
+
+    # 快速路径：纯十进制数字直接交给NumPy一次解析；八进制，以及个数与逗号数对不上的
+    # （空元素等）交给通用路径处理/报错
+    values = None
+    if body and not body.translate(_FAST_CHARS).translate(_SUFFIX_CHARS) and not _has_octal(body):
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            try:
+                values = np.fromstring(body.translate(_SUFFIX_CHARS), dtype=np.int64, sep=",")
+            except (ValueError, DeprecationWarning):
+                values = None
+        if values is not None and len(values) != body.count(",") + 1:
+            values = None
+
+    if values is None:
+        tokens = body.split(",") if body else []
+        is_float = dtype.kind == "f"
+        if not is_float:
+            # 次快路径：全部是十六进制/二进制/十进制常量时直接用int转换
+            try:
+                values = np.array([int(t, 0) for t in body.translate(_SUFFIX_CHARS).split(",")] if body else [],
+                                  dtype=np.int64)
+            except ValueError:
+                values = None
+        if values is None:
+            values = [_parse_token(t, macros or {}, is_float) for t in tokens]
+            values = np.array(values, dtype=np.float64 if is_float else np.int64)
+
+    # 整数类型检查取值范围，避免静默溢出
+    if dtype.kind in "iu" and len(values):
+        info = np.iinfo(dtype)
+        if values.min() < info.min or values.max() > info.max:
+            raise ValueError(f"数组元素超出{dtype.name}的取值范围")
+    return values.astype(dtype, copy=False)
+
+
+def parse_c_arrays(text):
+    """扫描整段C源码，返回其中所有数组初始化列表的CArray列表（按出现顺序）
+
+    支持注释、负数、十六进制/八进制、U/L后缀、类型转换和数值宏；
+    没有声明的裸花括号列表（例如"{1, 2, 3}"）作为匿名数组返回。
+    """
+    macros, text = _collect_macros(_strip_comments(text))
+
+    arrays = []
+    depth = 0
+    block_start = 0
+    statement_start = 0
+    for m in re.finditer(r'[{};]', text):
+        ch = m.group(0)
+        if ch == "{":
+            if depth == 0:
+                block_start = m.start()
+            depth += 1
+        elif ch == "}":
+            if depth == 0:
+                raise ValueError("花括号不匹配")
+            depth -= 1
+            if depth == 0:
+                prefix = text[statement_start:block_start].strip()
+                decl = _parse_declaration(prefix) if prefix else None
+                if decl or not prefix:
+                    name, ctype = decl or (None, None)
+                    body = text[block_start + 1:m.start()]
+                    arrays.append(CArray(name, ctype, parse_values(body, macros, _value_dtype(ctype))))
+                statement_start = m.end()
+        elif depth == 0:
+            statement_start = m.end()
+    if depth:
+        raise ValueError("花括号不匹配")
+    return arrays
+
+
+def parse_c_file(path):
+    """读取C源文件/头文件中的所有数组"""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return parse_c_arrays(f.read())
+
+
+# 导出时可自动选择的整数类型，按占用空间从小到大排列
+EXPORT_CTYPES = ["uint8_t", "int8_t", "uint16_t", "int16_t", "uint32_t", "int32_t", "uint64_t", "int64_t"]
+
+
+def narrowest_ctype(values):
+    """选择能容纳全部数值的最小整数类型，非负数优先使用无符号类型"""
+    values = np.asarray(values)
+    if len(values) == 0:
+        return EXPORT_CTYPES[0]
+    lo, hi = int(values.min()), int(values.max())
+    for ctype in EXPORT_CTYPES:
+        info = np.iinfo(_CTYPE_DTYPES[ctype])
+        if info.min <= lo and hi <= info.max:
+            return ctype
+    raise ValueError("数值超出64位整数范围")
+
+
+def narrowest_dtype(values):
+    """与narrowest_ctype对应的NumPy类型，用于紧凑地存储数组"""
+    return np.dtype(_CTYPE_DTYPES[narrowest_ctype(values)])
+
+
+def c_declaration(name, length, ctype="int", const=False, attributes=""):
+    """生成数组声明部分，例如 "const uint16_t Table[98] PROGMEM" """
+    decl = f"{'const ' if const else ''}{ctype} {name}[{length}]"
+    if attributes:
+        decl += f" {attributes}"
+    return decl
+
+
+def format_c_array(values, name="GeneratedCurve", per_line=10, ctype="int", const=False, attributes=""):
+    """把整数序列格式化为C数组定义
+
+    ctype为元素类型，"auto"表示自动选择能容纳全部数值的最小类型；
+    attributes写在方括号之后，例如 "PROGMEM" 或 '__attribute__((section(".rodata")))'。
+    """
+    buffer = io.StringIO()
+    write_c_array(buffer, values, name, per_line, ctype, const, attributes)
+    return buffer.getvalue()
+
+
+# 逐块写出C数组时每块的行数
+_WRITE_BLOCK_ROWS = 8192
+
+
+def chunk_bounds(chunks):
+    """逐块求全部元素的(最小值, 最大值)，没有元素时返回(0, 0)"""
+    lo = hi = None
+    for chunk in chunks:
+        if not len(chunk):
+            continue
+        part_lo, part_hi = int(np.min(chunk)), int(np.max(chunk))
+        lo = part_lo if lo is None else min(lo, part_lo)
+        hi = part_hi if hi is None else max(hi, part_hi)
+    return (0, 0) if lo is None else (lo, hi)
+
+
+def write_c_array(f, values, name="GeneratedCurve", per_line=10, ctype="int", const=False, attributes=""):
+    """把C数组定义逐块写入文本文件对象f，输出与format_c_array完全相同
+
+    values按切片逐块读取，可以是磁盘上的内存映射数组，内存占用与数组长度无关。
+    """
+    values = np.asarray(values)
+    block = _WRITE_BLOCK_ROWS * per_line
+    bounds = None
+    if ctype == "auto" or (ctype in _CTYPE_DTYPES and np.dtype(_CTYPE_DTYPES[ctype]).kind in "iu"):
+        bounds = chunk_bounds(values[i:i + block] for i in range(0, len(values), block))
+    chunks = (values[i:i + block] for i in range(0, len(values), block))
+    write_c_array_chunks(f, chunks, len(values), name, per_line, ctype, const, attributes, bounds)
+
+
+def write_c_array_chunks(f, chunks, length, name="GeneratedCurve", per_line=10, ctype="int", const=False,
+                         attributes="", bounds=None):
+    """把逐块给出的整数写成C数组定义，块的大小任意，输出与format_c_array完全相同
+
+    数组声明写在最前面，所以元素个数length必须事先给出；ctype为"auto"时需要给出取值范围
+    bounds=(最小值, 最大值)。给出bounds时在写入之前检查类型范围，否则逐块检查。
+    """
+    if ctype == "auto":
+        if bounds is None:
+            raise ValueError("逐块导出时自动选择类型需要事先给出取值范围")
+        ctype = narrowest_ctype(bounds)
+    info = None
+    if ctype in _CTYPE_DTYPES and np.dtype(_CTYPE_DTYPES[ctype]).kind in "iu":
+        info = np.iinfo(_CTYPE_DTYPES[ctype])
+        if bounds is not None and length and (bounds[0] < info.min or bounds[1] > info.max):
+            raise ValueError(f"数组元素超出{ctype}的取值范围")
+
+    f.write(f"{c_declaration(name, length, ctype, const, attributes)} = {{\n")
+    pending = []  # 上一块剩下的不足一行的元素
+    separator = ""
+    count = 0
+    for chunk in chunks:
+        chunk = np.asarray(chunk)
+        if not len(chunk):
+            continue
+        if bounds is None and info is not None and (chunk.min() < info.min or chunk.max() > info.max):
+            raise ValueError(f"数组元素超出{ctype}的取值范围")
+        count += len(chunk)
+        # 每块转换为字符串后按每行个数拼接，行与行之间用",\n"衔接
+        tokens = pending + list(map(str, chunk.astype(np.int64).tolist()))
+        full = len(tokens) - len(tokens) % per_line
+        if full:
+            f.write(separator + ",\n".join(",".join(tokens[j:j + per_line]) for j in range(0, full, per_line)))
+            separator = ",\n"
+        pending = tokens[full:]
+    if pending:
+        f.write(separator + ",".join(pending))
+    f.write("\n};")
+    if count != length:
+        raise ValueError(f"数组元素个数为{count}，与声明的{length}不一致")
+
+
+def pack_profiles(profiles):
+    """把多条曲线合并到一个数据池中，相同或互为前缀的曲线共用同一段数据
+
+    profiles为(名称, 数值)序列，返回(数据池数组, [(名称, 偏移, 长度), ...])，描述符顺序与输入一致。
+    """
+    profiles = [(name, np.asarray(values, dtype=np.int64)) for name, values in profiles]
+
+    # 先放长的曲线，短曲线才有机会作为前缀复用
+    order = sorted(range(len(profiles)), key=lambda i: -len(profiles[i][1]))
+    chunks = []  # 已放入数据池的(偏移, 字节串)
+    offsets = [0] * len(profiles)
+    pool_size = 0
+    for i in order:
+        data = profiles[i][1].tobytes()
+        for offset, placed in chunks:
+            if placed.startswith(data):
+                offsets[i] = offset
+                break
+        else:
+            offsets[i] = pool_size
+            chunks.append((pool_size, data))
+            pool_size += len(profiles[i][1])
+
+    pool = np.concatenate([np.frombuffer(data, dtype=np.int64) for _, data in chunks]) if chunks \
+        else np.zeros(0, dtype=np.int64)
+    descriptors = [(name, offsets[i], len(values)) for i, (name, values) in enumerate(profiles)]
+    return pool, descriptors
+
+
+def format_profile_header(profiles, pool_name="ProfilePool", ctype="auto", const=True, attributes="",
+                          per_line=10, guard="PROFILES_H"):
+    """把多条曲线导出为一个头文件：一个去重后的数据池，加上按编号O(1)索引的偏移/长度描述表
+
+    数据池和描述表声明为static，头文件被多个.c文件包含时不会出现重复定义的链接错误。
+    """
+    names = [name for name, _ in profiles]
+    for name in names:
+        if not re.fullmatch(r'[A-Za-z_]\w*', name):
+            raise ValueError(f"数组名称不是合法的C标识符: {name}")
+    if len(set(names)) != len(names):
+        raise ValueError("多条曲线使用了相同的数组名称")
+
+    pool, descriptors = pack_profiles(profiles)
+    max_offset = max((offset for _, offset, _ in descriptors), default=0)
+    max_length = max((length for _, _, length in descriptors), default=0)
+    offset_ctype = narrowest_ctype([max_offset, 0])
+    length_ctype = narrowest_ctype([max_length, 0])
+    desc_type = f"{pool_name}Desc"
+    prefix = re.sub(r'(?<=[a-z0-9])(?=[A-Z])', '_', pool_name).upper()
+
+    # 枚举名按大写生成，只有大小写不同的名称、以及名为count的曲线会与其他枚举值冲突
+    enum_names = {f"{prefix}_COUNT": None}
+    for name in names:
+        enum_name = f"{prefix}_{name.upper()}"
+        if enum_name in enum_names:
+            other = enum_names[enum_name]
+            raise ValueError(f"曲线名称 {name} 生成的枚举名 {enum_name} 与"
+                             + (f"曲线 {other} 的枚举名重复" if other else "曲线数量的枚举名重复"))
+        enum_names[enum_name] = name
+
+    lines = [
+        f"#ifndef {guard}",
+        f"#define {guard}",
+        "",
+        "#include <stdint.h>",
+        "",
+        f"/* {len(profiles)}条曲线共{sum(length for _, _, length in descriptors)}个点，"
+        f"去重后数据池{len(pool)}个点 */",
+        "static " + format_c_array(pool, pool_name, per_line, ctype, const, attributes),
+        "",
+        "typedef struct {",
+        f"    {offset_ctype} offset;",
+        f"    {length_ctype} length;",
+        f"}} {desc_type};",
+        "",
+        "enum {",
+    ]
+    lines += [f"    {prefix}_{name.upper()} = {i}," for i, name in enumerate(names)]
+    lines += [
+        f"    {prefix}_COUNT = {len(names)}",
+        "};",
+        "",
+        f"static {'const ' if const else ''}{desc_type} {pool_name}Table[{prefix}_COUNT]"
+        f"{' ' + attributes if attributes else ''} = {{",
+    ]
+    lines += [f"    {{{offset}, {length}}},  /* {name} */" for name, offset, length in descriptors]
+    lines += [
+        "};",
+        "",
+        f"#endif /* {guard} */",
+        "",
+    ]
+    return "\n".join(lines)
@@ -0,0 +1,140 @@
+"""脉冲时长表的约束检查与修正
+
+手工编辑后的表中可能出现电机跟不上的突变。这里对整张表做向量化的后处理，耗时与点数成线性关系：
+    - 加速度限制：相邻两步的速度按恒加速度走完一个步距角，a = (v2² - v1²) / (2·步距角)，
+      速度按curve_engine.angular_velocity换算（脉冲时长为定时器计数）；
+    - 单调性：加速段（开头到最快点）脉冲时长不增，减速段（最后一个最快点到结尾）不减；
+    - 可选的Savitzky-Golay平滑。
+加速度限制只会把速度调低（脉冲时长调大），不会让电机更快。
+"""
+import numpy as np
+
+import curve_engine
+
+# 违规类型
+ACCEL_VIOLATION = "加速度超限"
+MONOTONIC_VIOLATION = "单调性"
+
+# 默认的加速度上限(度/秒²)，默认时间基准下内置曲线类型在默认参数下都不超过该值
+DEFAULT_MAX_ACCEL = 6e8
+
+# 浮点误差带来的加速度容差(度/秒²)
+_ACCEL_TOLERANCE = 1e-6
+
+# 修正最多重复的轮数：限幅和取整后最快点的位置可能变化，分段随之改变，需要再修正一次
+_MAX_PASSES = 5
+
+
+def step_accelerations(pulse_times, step_angle=curve_engine.STEP_ANGLE, unit_us=curve_engine.PULSE_UNIT_US):
+    """第i步到第i+1步的加速度(度/秒²)，长度比输入少1"""
+    v = curve_engine.angular_velocity(pulse_times, step_angle, unit_us)
+    return (v[1:]**2 - v[:-1]**2) / (2 * step_angle)
+
+
+def segments(pulse_times):
+    """返回(加速段终点, 减速段起点)：[0, 终点]内脉冲时长应不增，[起点, 结尾]内应不减"""
+    pulse_times = np.asarray(pulse_times)
+    fastest = np.flatnonzero(pulse_times == pulse_times.min())
+    return int(fastest[0]), int(fastest[-1])
+
+
+def find_violations(pulse_times, max_accel=DEFAULT_MAX_ACCEL, monotonic=True,
+                    step_angle=curve_engine.STEP_ANGLE, unit_us=curve_engine.PULSE_UNIT_US):
+    """检查约束，返回{违规类型: 下标数组}，下标为违规的两步中后一步"""
+    pulse_times = np.asarray(pulse_times)
+    violations = {ACCEL_VIOLATION: np.zeros(0, dtype=np.int64),
+                  MONOTONIC_VIOLATION: np.zeros(0, dtype=np.int64)}
+    if len(pulse_times) < 2:
+        return violations
+
+    with np.errstate(invalid='ignore'):
+        accel = step_accelerations(pulse_times, step_angle, unit_us)
+    violations[ACCEL_VIOLATION] = np.flatnonzero(~(np.abs(accel) <= max_accel + _ACCEL_TOLERANCE)) + 1
+
+    if monotonic:
+        accel_end, decel_start = segments(pulse_times)
+        diff = np.diff(pulse_times)
+        steps = np.arange(1, len(pulse_times))
+        bad = ((steps <= accel_end) & (diff > 0)) | ((steps > decel_start) & (diff < 0))
+        violations[MONOTONIC_VIOLATION] = steps[bad]
+    return violations
+
+
+def savgol_coefficients(window, polyorder):
+    """Savitzky-Golay平滑系数：窗口内按最小二乘拟合polyorder次多项式后取中心点的值"""
+    if window % 2 == 0 or window < 3:
+        raise ValueError("平滑窗口必须是不小于3的奇数")
+    if polyorder >= window:
+        raise ValueError("多项式阶数必须小于平滑窗口")
+    half = window // 2
+    vander = np.vander(np.arange(-half, half + 1), polyorder + 1, increasing=True)
+    return np.linalg.pinv(vander)[0]
+
+
+def smooth(values, window=7, polyorder=2):
+    """Savitzky-Golay平滑，两端按端点值延拓"""
+    values = np.asarray(values, dtype=float)
+    if len(values) < window:
+        return values.copy()
+    coeffs = savgol_coefficients(window, polyorder)
+    padded = np.pad(values, window // 2, mode='edge')
+    return np.convolve(padded, coeffs[::-1], mode='valid')
+
+
+def enforce_monotonic(pulse_times):
+    """加速段取前缀最小值、减速段取后缀最大值，去掉段内的反向跳变"""
+    values = np.asarray(pulse_times, dtype=float).copy()
+    if len(values) < 2:
+        return values
+    accel_end, decel_start = segments(values)
+    values[:accel_end + 1] = np.minimum.accumulate(values[:accel_end + 1])
+    values[decel_start:] = np.maximum.accumulate(values[decel_start:])
+    return values
+
+
+def limit_acceleration(pulse_times, max_accel, step_angle=curve_engine.STEP_ANGLE, unit_us=curve_engine.PULSE_UNIT_US):
+    """限制相邻两步的加减速度，返回修正后的脉冲时长（浮点）
+
+    以速度平方u = v²为变量，约束变为 |u[i+1] - u[i]| ≤ 2·a·步距角，是线性的：
+    正向扫描 u[i] ≤ min(u[j] + c·(i-j))，反向扫描 u[i] ≤ min(u[j] + c·(j-i))，
+    两次扫描都化为累计最小值（np.minimum.accumulate），整张表线性时间完成。
+    """
+    values = np.asarray(pulse_times, dtype=float)
+    if len(values) < 2:
+        return values.copy()
+    u = curve_engine.angular_velocity(values, step_angle, unit_us)**2
+    c = 2 * max_accel * step_angle
+    ramp = c * np.arange(len(u))
+    # 加速过快：从前往后限制
+    u = np.minimum(u, np.minimum.accumulate(u - ramp) + ramp)
+    # 减速过快：从后往前限制
+    u = np.minimum(u, (np.minimum.accumulate((u + ramp)[::-1]))[::-1] - ramp)
+    return curve_engine.pulse_time(np.sqrt(u), step_angle, unit_us)
+
+
+def enforce(pulse_times, max_accel=DEFAULT_MAX_ACCEL, monotonic=True, smooth_window=0, polyorder=2,
+            value_range=None, step_angle=curve_engine.STEP_ANGLE, unit_us=curve_engine.PULSE_UNIT_US):
+    """依次做平滑、单调性修正和加速度限制，返回整数脉冲时长数组
+
+    smooth_window为0时不平滑；value_range为(最小值, 最大值)时结果限制在该范围内。
+    加速度限制之后向上取整，保证取整不会让速度变快。脉冲时长是整数，高速段相邻两个整数之间的
+    速度差本身就可能超过上限，这类无法消除的违规留给find_violations报告。
+    """
+    if max_accel <= 0:
+        raise ValueError("加速度上限必须大于0")
+    values = np.asarray(pulse_times, dtype=float)
+    if smooth_window:
+        values = smooth(values, smooth_window, polyorder)
+    if value_range is not None:
+        values = np.clip(values, *value_range)
+
+    for _ in range(_MAX_PASSES):
+        if monotonic:
+            values = enforce_monotonic(values)
+        values = np.ceil(limit_acceleration(values, max_accel, step_angle, unit_us) - 1e-9)
+        if value_range is not None:
+            values = np.clip(values, *value_range)
+        violations = find_violations(values, max_accel, monotonic, step_angle, unit_us)
+        if not any(len(v) for v in violations.values()):
+            break
+    return values.astype(np.int64)
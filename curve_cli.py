@@ -0,0 +1,231 @@
+"""步进电机曲线命令行生成工具
+
+不导入PyQt5和matplotlib，适合在固件构建流程（make/CMake、无界面的CI）中调用。
+
+示例:
+    python curve_cli.py --type s --points 98 --start 93 --end 8 --name AccelCurve -o accel.h
+    python curve_cli.py --type s --ctype auto --const --attribute PROGMEM
+    python curve_cli.py --type jerk --points 400 --start 93 --end 8 --accel 3e7 --jerk 6e10
+    python curve_cli.py --spec profiles.json -o profiles.h
+    python curve_cli.py --spec profiles.json --pool ProfilePool -o profiles.h
+    python curve_cli.py --type s --points 5000000 --table rig.npy --table-dtype uint16 -o rig.h
+    python curve_cli.py --from-table rig.npy --name RigCurve -o rig.h
+
+JSON描述文件可以是单个对象、对象列表，或者 {"profiles": [...]}，每个对象的键与命令行参数相同:
+    {"name": "AccelX", "type": "s", "points": 98, "start": 93, "end": 8,
+     "range": [0, 100], "start_size": 10, "end_size": 10, "power": 2.0,
+     "accel": 2e7, "jerk": 4e10, "quantize": "diffuse"}
+没有写出的键使用命令行参数的值。
+"""
+import argparse
+import json
+import os
+import re
+import sys
+
+import numpy as np
+
+import c_array
+import curve_engine
+import motion_profile
+import pulse_table
+
+# 描述文件中允许出现的键
+SPEC_KEYS = ("name", "type", "points", "start", "end", "range", "start_size", "end_size", "power",
+             "accel", "jerk", "quantize")
+
+
+def positive_int(text):
+    """argparse类型：大于0的整数"""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"必须大于0: {value}")
+    return value
+
+
+def build_parser():
+    """创建命令行参数解析器"""
+    parser = argparse.ArgumentParser(description="生成步进电机加减速曲线并输出C数组")
+    parser.add_argument("--type", default="线性",
+                        help="曲线类型: " + "/".join(curve_engine.CURVE_TYPES + motion_profile.PROFILE_TYPES) +
+                             "，或英文别名 " + "/".join(list(curve_engine.CURVE_ALIASES) +
+                                                     list(motion_profile.PROFILE_ALIASES)))
+    parser.add_argument("--points", type=positive_int, default=98, help="点数")
+    parser.add_argument("--start", type=int, default=93, help="起始值")
+    parser.add_argument("--end", type=int, default=8, help="终止值")
+    parser.add_argument("--range", type=int, nargs=2, default=[0, 100], metavar=("START", "END"),
+                        help="生效范围(百分比)")
+    parser.add_argument("--start-size", type=int, default=10, help="起始段点数")
+    parser.add_argument("--end-size", type=int, default=10, help="末尾段点数")
+    parser.add_argument("--power", type=float, default=2.0, help="幂函数指数")
+    parser.add_argument("--accel", type=float, default=motion_profile.DEFAULT_MAX_ACCEL,
+                        help="最大加速度(度/秒²)，用于trapezoid/jerk曲线；脉冲时长按一个计数"
+                             f"{curve_engine.PULSE_UNIT_US}us、步距角{curve_engine.STEP_ANGLE}°换算为速度")
+    parser.add_argument("--jerk", type=float, default=motion_profile.DEFAULT_MAX_JERK,
+                        help="最大加加速度(度/秒³)，用于jerk曲线")
+    parser.add_argument("--quantize", default=None,
+                        help="取整方式: truncate(截断)/round(四舍五入)/diffuse(误差扩散，总时间与设计曲线一致)，"
+                             "默认公式曲线截断、运动学曲线四舍五入")
+    parser.add_argument("--name", default="GeneratedCurve", help="C数组名称")
+    parser.add_argument("--ctype", default="int",
+                        help="元素类型，例如 uint8_t/uint16_t/uint32_t，auto表示自动选择最小类型")
+    parser.add_argument("--const", action="store_true", help="声明为const")
+    parser.add_argument("--attribute", default="", help="写在数组声明后的属性，例如 PROGMEM")
+    parser.add_argument("--per-line", type=int, default=10, help="每行输出的元素个数")
+    parser.add_argument("--spec", action="append", default=[],
+                        help="JSON描述文件，可多次指定以一次导出多条曲线")
+    parser.add_argument("--pool", metavar="NAME",
+                        help="把所有曲线合并导出为一个头文件：去重后的数据池NAME和偏移/长度描述表NAMETable")
+    parser.add_argument("--table", metavar="PATH",
+                        help="把曲线逐块写入磁盘上的.npy数据表（内存映射），再从数据表逐块导出，用于数百万步的长曲线")
+    parser.add_argument("--table-dtype", default=pulse_table.DEFAULT_DTYPE, choices=sorted(pulse_table.TABLE_DTYPES),
+                        help="数据表的元素类型")
+    parser.add_argument("--from-table", metavar="PATH", help="直接导出已有的.npy数据表，不重新生成")
+    parser.add_argument("-o", "--output", default="-", help="输出文件，默认为标准输出")
+    return parser
+
+
+def load_specs(path, defaults):
+    """读取JSON描述文件，返回补全默认值后的曲线参数列表"""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("profiles", [data])
+
+    specs = []
+    for i, item in enumerate(data):
+        unknown = set(item) - set(SPEC_KEYS)
+        if unknown:
+            raise ValueError(f"{path} 第{i + 1}条曲线包含未知参数: {', '.join(sorted(unknown))}")
+        spec = dict(defaults)
+        spec.update(item)
+        # 点数在写出任何内容之前检查，避免输出半个数组声明
+        points = spec["points"]
+        if isinstance(points, bool) or not isinstance(points, int) or points < 1:
+            raise ValueError(f"{path} 第{i + 1}条曲线的点数必须是大于0的整数: {points}")
+        specs.append(spec)
+    return specs
+
+
+def chunks_from_spec(spec):
+    """按参数字典逐块生成曲线，返回生成器，内存占用与点数无关"""
+    curve_type = spec["type"]
+    curve_type = motion_profile.PROFILE_ALIASES.get(curve_type.lower(), curve_type)
+    # 未指定取整方式时保持各类曲线原有的默认值，已有的构建输出不变
+    quantization = {}
+    if spec["quantize"] is not None:
+        quantization["quantization"] = curve_engine.resolve_quantize_mode(spec["quantize"])
+    if curve_type in motion_profile.PROFILE_TYPES:
+        return motion_profile.iter_chunks(curve_type, int(spec["points"]), spec["start"], spec["end"],
+                                          spec["accel"], spec["jerk"], **quantization)
+
+    range_start, range_end = spec["range"]
+    return curve_engine.iter_chunks(curve_engine.resolve_curve_type(curve_type),
+                                    int(spec["points"]), spec["start"], spec["end"],
+                                    (range_start / 100, range_end / 100),
+                                    int(spec["start_size"]), int(spec["end_size"]), spec["power"],
+                                    **quantization)
+
+
+def generate_from_spec(spec):
+    """按参数字典生成一条完整的曲线"""
+    chunks = list(chunks_from_spec(spec))
+    return np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int64)
+
+
+def write_spec(f, spec, args):
+    """逐块生成一条曲线并写成C数组
+
+    声明写在最前面，先额外生成一遍求取值范围，用于自动选择类型和在写出之前检查类型范围。
+    """
+    bounds = c_array.chunk_bounds(chunks_from_spec(spec))
+    c_array.write_c_array_chunks(f, chunks_from_spec(spec), int(spec["points"]), spec["name"], args.per_line,
+                                 args.ctype, args.const, args.attribute, bounds)
+
+
+def write_output(path, write):
+    """调用write(f)写出结果：标准输出直接写；文件先写临时文件，成功后再替换，出错时不留下半个文件"""
+    if path == "-":
+        write(sys.stdout)
+        return
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def header_guard(output, pool_name):
+    """根据输出文件名生成头文件保护宏，输出到标准输出时使用数据池名称"""
+    base = os.path.basename(output) if output != "-" else pool_name + ".h"
+    return re.sub(r'\W', '_', base).upper()
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    defaults = {
+        "name": args.name,
+        "type": args.type,
+        "points": args.points,
+        "start": args.start,
+        "end": args.end,
+        "range": args.range,
+        "start_size": args.start_size,
+        "end_size": args.end_size,
+        "power": args.power,
+        "accel": args.accel,
+        "jerk": args.jerk,
+        "quantize": args.quantize,
+    }
+
+    if args.table or args.from_table:
+        if args.spec or args.pool:
+            print("错误: --table/--from-table 不能与 --spec/--pool 同时使用", file=sys.stderr)
+            return 1
+        try:
+            table = (pulse_table.open_table(args.from_table) if args.from_table
+                     else pulse_table.fill_table(args.table, int(defaults["points"]), chunks_from_spec(defaults),
+                                                 args.table_dtype))
+
+            def write(f):
+                c_array.write_c_array(f, table, args.name, args.per_line, args.ctype, args.const, args.attribute)
+                f.write("\n")
+
+            write_output(args.output, write)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"错误: {e}", file=sys.stderr)
+            return 1
+        return 0
+
+    try:
+        specs = [spec for path in args.spec for spec in load_specs(path, defaults)] or [defaults]
+        names = [spec["name"] for spec in specs]
+        if len(set(names)) != len(names):
+            raise ValueError("多条曲线使用了相同的数组名称")
+        if args.pool:
+            # 数据池需要比较各条曲线的内容，整条生成
+            text = c_array.format_profile_header([(spec["name"], generate_from_spec(spec)) for spec in specs],
+                                                 args.pool, args.ctype, args.const, args.attribute,
+                                                 args.per_line, header_guard(args.output, args.pool))
+            write_output(args.output, lambda f: f.write(text))
+        else:
+            # 逐条、逐块生成并写出，不在内存中保存完整的曲线和文本
+            def write(f):
+                for i, spec in enumerate(specs):
+                    if i:
+                        f.write("\n\n")
+                    write_spec(f, spec, args)
+                f.write("\n")
+
+            write_output(args.output, write)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+"""步进电机曲线计算引擎
+
+只依赖NumPy，不加载Qt和matplotlib，可以在图形界面之外（例如固件构建流程）直接生成曲线。
+所有公式都按"第几行曲线、第几个点"的下标网格计算，单条曲线和批量参数扫描共用同一套实现。
+"""
+import numpy as np
+
+# 步距角(度)，默认1.8°的两相步进电机
+STEP_ANGLE = 1.8
+
+# 单个脉冲计数对应的时间(us)：1MHz定时器5分频。脉冲时长的数值是定时器计数，
+# 全部速度、加速度的换算（angular_velocity/pulse_time）都以此为时间基准
+PULSE_UNIT_US = 5
+
+# 支持的曲线类型（与界面下拉框中的名称一致）
+CURVE_TYPES = ["线性", "指数", "S型", "余弦", "抛物线", "自定义幂函数"]
+
+# 曲线类型的英文别名，方便在命令行和构建脚本中使用
+CURVE_ALIASES = {
+    "linear": "线性",
+    "exp": "指数",
+    "exponential": "指数",
+    "s": "S型",
+    "scurve": "S型",
+    "cosine": "余弦",
+    "parabola": "抛物线",
+    "power": "自定义幂函数",
+}
+
+# 分块生成时每块的点数，长曲线的内存占用只与该值有关
+CHUNK_SIZE = 1 << 18
+
+# 浮点曲线转换为整数脉冲时长的方式，以及英文别名
+QUANTIZE_MODES = ["截断", "四舍五入", "误差扩散"]
+QUANTIZE_ALIASES = {
+    "truncate": "截断",
+    "round": "四舍五入",
+    "diffuse": "误差扩散",
+}
+
+
+def resolve_curve_type(name):
+    """把曲线类型名称或英文别名转换为标准名称"""
+    if name in CURVE_TYPES:
+        return name
+    try:
+        return CURVE_ALIASES[name.lower()]
+    except KeyError:
+        raise ValueError(f"未知的曲线类型: {name}") from None
+
+
+def resolve_quantize_mode(name):
+    """把取整方式名称或英文别名转换为标准名称"""
+    if name in QUANTIZE_MODES:
+        return name
+    try:
+        return QUANTIZE_ALIASES[name.lower()]
+    except KeyError:
+        raise ValueError(f"未知的取整方式: {name}") from None
+
+
+def quantize(values, mode="截断"):
+    """把浮点脉冲时长转换为整数，二维数组按行处理
+
+    截断: 直接截断小数部分（原有方式），每个值都偏小，总时间偏短；
+    四舍五入: 每个值独立取最近的整数；
+    误差扩散: 对累计时间四舍五入后再差分，每一步的舍入误差顺延到后面的点，
+              任意时刻的累计时间误差不超过半个单位，总时间与设计曲线一致。
+    """
+    mode = resolve_quantize_mode(mode)
+    values = np.asarray(values, dtype=float)
+    if mode == "截断":
+        return values.astype(int)
+    if mode == "四舍五入":
+        return np.rint(values).astype(int)
+    total = np.rint(np.cumsum(values, axis=-1))
+    return np.diff(total, axis=-1, prepend=0).astype(int)
+
+
+def _smoothstep(t):
+    """S型过渡使用的三次多项式"""
+    return 3*t**2 - 2*t**3
+
+
+def _linspace_grid(lo, hi, k, n):
+    """按np.linspace相同的计算方式求第k个等分点，lo/hi/k/n均可广播"""
+    div = np.maximum(n - 1, 1)
+    y = k * ((hi - lo) / div) + lo
+    # 与np.linspace一样，最后一个点精确等于终点
+    return np.where((k == n - 1) & (n > 1), hi, y)
+
+
+def _shape(curve_type, start, end, k, n, power):
+    """主体曲线在生效范围内第k个点的值（共n个点）"""
+    if curve_type == "指数":
+        # 指数变化 - 防止log(0)错误
+        start_val = np.log(np.maximum(1, start))
+        end_val = np.log(np.maximum(1, end))
+        return np.exp(_linspace_grid(start_val, end_val, k, n))
+
+    t = _linspace_grid(0, 1.0, k, n)
+    if curve_type == "S型":
+        # S型曲线 (三次多项式)
+        return start + (end - start) * _smoothstep(t)
+    if curve_type == "余弦":
+        # 余弦变化
+        return start + (end - start) * (1 - np.cos(t * np.pi)) / 2
+    if curve_type == "抛物线":
+        # 抛物线变化
+        return start + (end - start) * t**2
+    if curve_type == "自定义幂函数":
+        # 幂函数变化
+        tp = t**power
+        return np.where(start >= end, start - (start - end) * tp, start + (end - start) * tp)
+    # 线性变化（默认）
+    return _linspace_grid(start, end, k, n)
+
+
+def effect_window(n_points, range_start, range_end):
+    """根据生效范围比例(0-1)计算生效区间的起止下标，支持数组参数"""
+    start_idx = np.asarray(n_points * np.asarray(range_start, dtype=float)).astype(int)
+    end_idx = np.asarray(n_points * np.asarray(range_end, dtype=float)).astype(int)
+    if np.any(end_idx < start_idx):
+        raise ValueError("生效范围无效: 起点大于终点")
+    return start_idx, end_idx
+
+
+def _blend(values, mask, k, size, lo, hi):
+    """在mask为真的位置写入从lo到hi的S型过渡值，只计算需要过渡的点"""
+    rows, cols = np.nonzero(mask)
+    lo = lo[rows, 0]
+    t = _linspace_grid(0, 1.0, k[rows, cols], size[rows, 0])
+    values[rows, cols] = lo + (hi[rows, 0] - lo) * _smoothstep(t)
+
+
+def _evaluate(curve_type, cols, n_points, start, end, range_start, range_end,
+              start_size, end_size, power):
+    """计算每组参数在列下标cols处的曲线值（浮点），参数均为形状(N, 1)的列向量"""
+    start_idx, end_idx = effect_window(n_points, range_start, range_end)
+    effect_points = end_idx - start_idx
+
+    # 确保起始段和末尾段点数不超过生效范围
+    start_size = np.minimum(start_size, effect_points // 3)
+    end_size = np.minimum(end_size, effect_points // 3)
+
+    # 生效范围内的局部下标，范围外的先截断，最后再用起始值/终止值覆盖
+    local = cols - start_idx
+    k = np.clip(local, 0, np.maximum(effect_points - 1, 0))
+    values = np.array(_shape(curve_type, start, end, k, effect_points, power), dtype=float)
+
+    # 起始段和末尾段使用S型过渡，衔接主体曲线的首尾值
+    curve_start_val = _shape(curve_type, start, end, 0, effect_points, power)
+    curve_end_val = _shape(curve_type, start, end, np.maximum(effect_points - 1, 0), effect_points, power)
+    _blend(values, k < start_size, k, start_size, start, curve_start_val)
+    tail_k = k - (effect_points - end_size)
+    _blend(values, tail_k >= 0, tail_k, end_size, curve_end_val, end)
+
+    # 生效范围之前保持起始值，之后保持终止值
+    np.copyto(values, start, where=local < 0)
+    np.copyto(values, end, where=local >= effect_points)
+    return values
+
+
+def generate_batch(curve_type, n_points, start, end, range_start=0.0, range_end=1.0,
+                   start_size=10, end_size=10, power=2.0, quantization="截断"):
+    """批量生成曲线，返回形状为(N, n_points)的整数矩阵
+
+    start/end/range_start/range_end/start_size/end_size/power可以是标量或长度为N的数组，
+    按NumPy广播规则组合成N组参数，一次向量化计算全部曲线。
+    quantization为取整方式，见quantize。
+    """
+    params = _column_params(start, end, range_start, range_end, start_size, end_size, power)
+    values = _evaluate(curve_type, np.arange(n_points), n_points, *params)
+    return quantize(values, quantization)
+
+
+def _column_params(start, end, range_start, range_end, start_size, end_size, power):
+    """所有参数广播成同样长度的(N, 1)列向量，段点数取整"""
+    params = np.broadcast_arrays(*[np.atleast_1d(np.asarray(v, dtype=float)) for v in
+                                   (start, end, range_start, range_end, start_size, end_size, power)])
+    start, end, range_start, range_end, start_size, end_size, power = [p.reshape(-1, 1) for p in params]
+    return start, end, range_start, range_end, start_size.astype(int), end_size.astype(int), power
+
+
+def generate(curve_type, n_points, start, end, effect_range=(0.0, 1.0),
+             start_size=10, end_size=10, power=2.0, quantization="截断"):
+    """根据参数生成一条整数脉冲时长数组
+
+    effect_range为生效范围的(起点比例, 终点比例)，取值0-1；
+    生效范围之前保持起始值，之后保持终止值。
+    """
+    range_start, range_end = effect_range
+    return generate_batch(curve_type, n_points, start, end, range_start, range_end,
+                          start_size, end_size, power, quantization)[0]
+
+
+def quantize_chunks(chunks, mode="截断"):
+    """对逐块给出的浮点脉冲时长逐块取整，是quantize的生成器版本
+
+    误差扩散在块之间接续累计和，结果与整条曲线一次quantize完全相同。
+    """
+    mode = resolve_quantize_mode(mode)
+    total = 0.0  # 误差扩散：之前所有点的浮点累计和
+    for values in chunks:
+        if mode == "误差扩散":
+            # 把上一块的累计和放在最前面再顺序累加，与整条曲线一次cumsum的结果逐位相同
+            running = np.cumsum(np.concatenate(([total], values)))
+            total = running[-1]
+            yield np.diff(np.rint(running)).astype(int)
+        else:
+            yield quantize(values, mode)
+
+
+def iter_chunks(curve_type, n_points, start, end, effect_range=(0.0, 1.0), start_size=10, end_size=10,
+                power=2.0, quantization="截断", chunk_size=CHUNK_SIZE):
+    """与generate参数相同的生成器，每次给出不超过chunk_size个整数脉冲时长
+
+    只有一块的临时数组，内存占用与点数无关；依次拼接所有块与generate的结果完全相同。
+    """
+    range_start, range_end = effect_range
+    params = _column_params(start, end, range_start, range_end, start_size, end_size, power)
+
+    def float_chunks():
+        for lo in range(0, n_points, chunk_size):
+            cols = np.arange(lo, min(lo + chunk_size, n_points))
+            yield _evaluate(curve_type, cols, n_points, *params)[0]
+
+    return quantize_chunks(float_chunks(), quantization)
+
+
+def write_chunks(out, chunks):
+    """把逐块给出的数据依次写入out（可以是内存映射数组），返回写入的点数"""
+    lo = 0
+    for chunk in chunks:
+        if lo + len(chunk) > len(out):
+            raise ValueError("数据超出目标数组的长度")
+        out[lo:lo + len(chunk)] = chunk
+        lo += len(chunk)
+    return lo
+
+
+def generate_into(out, curve_type, start, end, effect_range=(0.0, 1.0), start_size=10, end_size=10,
+                  power=2.0, quantization="截断", chunk_size=CHUNK_SIZE):
+    """与generate相同，但分块计算并写入out，点数为len(out)；out可以是磁盘上的内存映射数组"""
+    write_chunks(out, iter_chunks(curve_type, len(out), start, end, effect_range, start_size, end_size,
+                                  power, quantization, chunk_size))
+    return out
+
+
+def angular_velocity(pulse_times, step_angle=STEP_ANGLE, unit_us=PULSE_UNIT_US):
+    """脉冲时长（计数，一个计数为unit_us微秒）对应的角速度(度/秒)，支持标量和数组
+
+    step_angle为每个脉冲转过的角度，使用细分时为步距角/细分数。
+    """
+    with np.errstate(divide='ignore'):
+        return step_angle / (np.asarray(pulse_times, dtype=float) * (unit_us * 1e-6))
+
+
+def pulse_time(velocity, step_angle=STEP_ANGLE, unit_us=PULSE_UNIT_US):
+    """角速度(度/秒)对应的脉冲时长（计数，浮点），angular_velocity的反函数"""
+    with np.errstate(divide='ignore'):
+        return step_angle / (np.asarray(velocity, dtype=float) * (unit_us * 1e-6))
+
+
+def full_circle_time(pulse_times, step_angle=STEP_ANGLE, unit_us=PULSE_UNIT_US):
+    """按该脉冲时长旋转一圈所需的时间(ms)，支持标量和数组"""
+    return (360 / step_angle) * np.asarray(pulse_times, dtype=float) * (unit_us / 1000)
+
+
+def cumulative_time(pulse_times, unit=PULSE_UNIT_US):
+    """走到每一步时的累计耗时(us)"""
+    return np.cumsum(pulse_times, dtype=np.int64) * unit
+
+
+class PrefixSum:
+    """脉冲时长的树状数组(Fenwick)：单点修改和前缀和查询都是O(log n)
+
+    拖动编辑时每帧只改一个点，用它求走到某一步的累计时间，不必每帧重新做O(n)的累计和。
+    """
+
+    def __init__(self, values):
+        values = np.asarray(values, dtype=np.int64)
+        # 节点i保存values[i & (i + 1):i + 1]之和，用累计和向量化构建
+        sums = np.cumsum(values)
+        i = np.arange(len(values))
+        lo = i & (i + 1)
+        self.tree = sums - np.where(lo > 0, sums[lo - 1], 0)
+
+    def add(self, idx, delta):
+        """values[idx]增加delta"""
+        tree = self.tree
+        n = len(tree)
+        while idx < n:
+            tree[idx] += delta
+            idx |= idx + 1
+
+    def prefix(self, idx):
+        """values[0]到values[idx]（含）之和"""
+        total = 0
+        while idx >= 0:
+            total += int(self.tree[idx])
+            idx = (idx & (idx + 1)) - 1
+        return total
@@ -0,0 +1,128 @@
+"""编辑历史（撤销/重做）
+
+只记录被修改点的(下标, 旧值, 新值)，不保存整个数组的副本，撤销和重做的耗时只与修改的点数有关。
+一次拖动手势中的所有修改合并成一条记录，同一个点被反复修改时只保留最初的旧值和最后的新值。
+"""
+import numpy as np
+
+# 最多保留的记录条数和修改点数，超出后丢弃最早的记录
+MAX_ENTRIES = 1000
+MAX_DELTAS = 1000000
+
+
+class EditHistory:
+    """撤销/重做栈，每条记录为(下标数组, 旧值数组, 新值数组)"""
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_deltas=MAX_DELTAS):
+        self.max_entries = max_entries
+        self.max_deltas = max_deltas
+        self.undo_stack = []
+        self.redo_stack = []
+        self.delta_count = 0  # 两个栈中记录的修改点总数
+        self.pending = None  # 手势进行中时为 {下标: [旧值, 新值]}
+
+    def begin(self):
+        """开始一个手势，直到commit之前的修改合并为一条记录；手势已经开始时不做任何事"""
+        if self.pending is None:
+            self.pending = {}
+
+    def record(self, idx, old, new):
+        """记录一个点的修改"""
+        if self.pending is None:
+            self._push([idx], [old], [new])
+        elif idx in self.pending:
+            self.pending[idx][1] = new
+        else:
+            self.pending[idx] = [old, new]
+
+    def record_many(self, indices, old, new):
+        """记录一组点的修改，indices中不能有重复下标"""
+        if self.pending is None:
+            self._push(indices, old, new)
+            return
+        for idx, old_value, new_value in zip(np.asarray(indices).tolist(), np.asarray(old).tolist(),
+                                             np.asarray(new).tolist()):
+            self.record(idx, old_value, new_value)
+
+    def commit(self):
+        """结束手势，把期间的修改作为一条记录入栈"""
+        if self.pending is None:
+            return
+        items = self.pending
+        self.pending = None
+        if items:
+            values = np.array(list(items.values()), dtype=np.int64)
+            self._push(list(items.keys()), values[:, 0], values[:, 1])
+
+    def _push(self, indices, old, new):
+        """新记录入栈，清空重做栈，超出上限时丢弃最早的记录"""
+        indices = np.asarray(indices, dtype=np.int64)
+        old = np.asarray(old, dtype=np.int64)
+        new = np.asarray(new, dtype=np.int64)
+        changed = old != new
+        if not changed.any():
+            return
+        entry = (indices[changed], old[changed], new[changed])
+
+        self.delta_count -= sum(len(e[0]) for e in self.redo_stack)
+        self.redo_stack.clear()
+        self.undo_stack.append(entry)
+        self.delta_count += len(entry[0])
+        while len(self.undo_stack) > 1 and (len(self.undo_stack) > self.max_entries or
+                                            self.delta_count > self.max_deltas):
+            self.delta_count -= len(self.undo_stack.pop(0)[0])
+
+    def undo(self):
+        """撤销最近一条记录，返回需要写回的(下标数组, 旧值数组)，没有可撤销的记录时返回None"""
+        self.commit()
+        if not self.undo_stack:
+            return None
+        indices, old, new = self.undo_stack.pop()
+        self.redo_stack.append((indices, old, new))
+        return indices, old
+
+    def redo(self):
+        """重做最近撤销的一条记录，返回需要写回的(下标数组, 新值数组)，没有可重做的记录时返回None"""
+        self.commit()
+        if not self.redo_stack:
+            return None
+        indices, old, new = self.redo_stack.pop()
+        self.undo_stack.append((indices, old, new))
+        return indices, new
+
+    def to_arrays(self):
+        """把撤销/重做栈展开为扁平数组，用于保存到工程文件；进行中的手势先结束"""
+        self.commit()
+        arrays = {}
+        for name, stack in (("undo", self.undo_stack), ("redo", self.redo_stack)):
+            arrays[name + "_lengths"] = np.array([len(entry[0]) for entry in stack], dtype=np.int64)
+            for i, part in enumerate(("indices", "old", "new")):
+                arrays[f"{name}_{part}"] = (np.concatenate([entry[i] for entry in stack]) if stack
+                                            else np.zeros(0, dtype=np.int64))
+        return arrays
+
+    def load_arrays(self, arrays):
+        """从to_arrays得到的数组恢复撤销/重做栈，原有记录被清空"""
+        self.clear()
+        for name, stack in (("undo", self.undo_stack), ("redo", self.redo_stack)):
+            lengths = np.asarray(arrays[name + "_lengths"], dtype=np.int64)
+            if len(lengths) == 0:
+                continue
+            splits = np.cumsum(lengths)[:-1]
+            parts = [np.split(np.asarray(arrays[f"{name}_{part}"], dtype=np.int64), splits)
+                     for part in ("indices", "old", "new")]
+            stack.extend(zip(*parts))
+            self.delta_count += int(lengths.sum())
+
+    def can_undo(self):
+        return bool(self.undo_stack) or bool(self.pending)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def clear(self):
+        """清空全部历史（例如整个数组被替换时）"""
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.delta_count = 0
+        self.pending = None
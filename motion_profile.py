@@ -0,0 +1,196 @@
+"""按电机运动学生成加减速曲线
+
+根据目标速度、最大加速度、最大加加速度和步距角，精确计算每一步的脉冲间隔：
+把速度变化过程分成若干个加加速度恒定的时间段，位置是时间的三次多项式，
+对每一步的位置反解出到达时刻，相邻时刻之差就是脉冲间隔。全部步数一次向量化求解。
+"""
+import numpy as np
+
+import curve_engine
+
+# 界面和命令行中使用的曲线类型名称
+TRAPEZOID = "梯形(加速度限制)"
+JERK_LIMITED = "S型(加加速度限制)"
+PROFILE_TYPES = [TRAPEZOID, JERK_LIMITED]
+
+# 英文别名
+PROFILE_ALIASES = {
+    "trapezoid": TRAPEZOID,
+    "jerk": JERK_LIMITED,
+    "scurve-jerk": JERK_LIMITED,
+}
+
+# 默认的最大加速度(度/秒²)和最大加加速度(度/秒³)：默认时间基准下93→8的曲线约30步完成加速
+DEFAULT_MAX_ACCEL = 2e7
+DEFAULT_MAX_JERK = 4e10
+
+# 浮点误差使匀速段恰为整数的脉冲时长略小于该整数（例如7.9999999），截断时会少1；
+# 与整数相差不到该容差的值直接取该整数
+_INTEGER_TOLERANCE = 1e-6
+
+# 牛顿迭代次数上限，初值与真实解相差不超过3倍时通常6次以内收敛
+_NEWTON_ITERATIONS = 30
+
+
+def _ramp_segments(v0, v1, max_accel, max_jerk=None):
+    """从速度v0加速到v1的分段，返回[(起始加速度, 加加速度, 持续时间), ...]"""
+    dv = v1 - v0
+    if dv <= 0:
+        return []
+    if max_jerk is None:
+        # 梯形：恒定加速度
+        return [(max_accel, 0.0, dv / max_accel)]
+
+    if dv >= max_accel**2 / max_jerk:
+        # 加速度能达到上限：加加速度段 + 恒加速度段 + 减加速度段
+        t_jerk = max_accel / max_jerk
+        t_const = (dv - max_accel**2 / max_jerk) / max_accel
+        return [(0.0, max_jerk, t_jerk), (max_accel, 0.0, t_const), (max_accel, -max_jerk, t_jerk)]
+
+    # 速度差较小，加速度达不到上限
+    peak_accel = np.sqrt(dv * max_jerk)
+    t_jerk = peak_accel / max_jerk
+    return [(0.0, max_jerk, t_jerk), (peak_accel, -max_jerk, t_jerk)]
+
+
+def _plan(v0, v1, max_accel, max_jerk=None):
+    """从速度v0加速到v1再匀速运行的运动规划
+
+    返回各段起点的(时间, 位置, 速度, 加速度, 加加速度, 持续时间)数组，最后一段为无限长的匀速段。
+    """
+    rows = []
+    t = p = 0.0
+    v = float(v0)
+    for a, j, duration in _ramp_segments(v0, v1, max_accel, max_jerk):
+        rows.append((t, p, v, a, j, duration))
+        p += v * duration + a * duration**2 / 2 + j * duration**3 / 6
+        v += a * duration + j * duration**2 / 2
+        t += duration
+    rows.append((t, p, float(v1), 0.0, 0.0, np.inf))
+    return tuple(np.array(col) for col in zip(*rows))
+
+
+def _arrival_times(positions, plan):
+    """求到达各个角度位置的时刻，所有位置一次向量化求解"""
+    seg_t, seg_p, seg_v, seg_a, seg_j, seg_d = plan
+    idx = np.clip(np.searchsorted(seg_p, positions, side='left') - 1, 0, len(seg_t) - 1)
+    d = positions - seg_p[idx]
+    v, a, j, duration = seg_v[idx], seg_a[idx], seg_j[idx], seg_d[idx]
+
+    # 段内位置 f(τ) = vτ + aτ²/2 + jτ³/6 - d 在本段内单调递增且为凸函数（加速度始终不小于0），
+    # 从任意满足f(τ)≥0的点出发，牛顿迭代都会从右侧单调收敛到解。
+    # 只保留速度项/加速度项/加加速度项分别得到的τ都满足这一条件（加速度项和加加速度项要求j≥0），
+    # 取其中最小者并限制在段长以内作为初值。
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tau = np.minimum.reduce([np.where(v > 0, d / v, np.inf),
+                                 np.where((a > 0) & (j >= 0), np.sqrt(2 * d / a), np.inf),
+                                 np.where(j > 0, np.cbrt(6 * d / j), np.inf),
+                                 duration])
+    # 每个元素各自收敛后就不再迭代，结果只取决于该元素本身，与一次求解多少个位置无关
+    active = np.arange(len(tau))
+    for _ in range(_NEWTON_ITERATIONS):
+        if len(active) == 0:
+            break
+        t, va, aa, ja = tau[active], v[active], a[active], j[active]
+        f = va * t + aa * t**2 / 2 + ja * t**3 / 6 - d[active]
+        df = va + aa * t + ja * t**2 / 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = np.where(df > 0, f / df, 0.0)
+        t = t - step
+        tau[active] = t
+        active = active[np.abs(step) > 1e-15 * np.maximum(t, 1e-12)]
+    return seg_t[idx] + tau
+
+
+def step_times(n_steps, start_speed, target_speed, max_accel, max_jerk=None, step_angle=curve_engine.STEP_ANGLE):
+    """从start_speed变速到target_speed后匀速运行，返回第1..n_steps步的到达时刻(秒)
+
+    速度单位为度/秒，加速度为度/秒²，加加速度为度/秒³；max_jerk为None时按梯形曲线计算。
+    start_speed大于target_speed时为减速，按加速过程的时间反演计算。
+    """
+    return _times_at(step_angle * np.arange(1, n_steps + 1), start_speed, target_speed, max_accel, max_jerk)
+
+
+def _times_at(positions, start_speed, target_speed, max_accel, max_jerk=None):
+    """到达各个角度位置(度)的时刻(秒)，见step_times"""
+    if target_speed <= 0 or max_accel <= 0 or (max_jerk is not None and max_jerk <= 0):
+        raise ValueError("目标速度、最大加速度和最大加加速度必须大于0")
+    if start_speed < 0:
+        raise ValueError("起始速度不能为负数")
+
+    if start_speed <= target_speed:
+        return _arrival_times(positions, _plan(start_speed, target_speed, max_accel, max_jerk))
+
+    # 减速：从目标速度加速到起始速度的过程倒过来走
+    plan = _plan(target_speed, start_speed, max_accel, max_jerk)
+    ramp_time, ramp_distance = plan[0][-1], plan[1][-1]
+    in_ramp = positions <= ramp_distance
+    reversed_times = ramp_time - _arrival_times(np.maximum(ramp_distance - positions, 0.0), plan)
+    cruise_times = ramp_time + (positions - ramp_distance) / target_speed
+    return np.where(in_ramp, reversed_times, cruise_times)
+
+
+def _snap_integers(intervals):
+    """把与整数相差不到_INTEGER_TOLERANCE的脉冲时长取为该整数"""
+    nearest = np.rint(intervals)
+    return np.where(np.abs(intervals - nearest) < _INTEGER_TOLERANCE, nearest, intervals)
+
+
+def generate_profile(curve_type, n_steps, start_speed, target_speed, max_accel, max_jerk=None,
+                     step_angle=curve_engine.STEP_ANGLE, unit_us=curve_engine.PULSE_UNIT_US):
+    """生成n_steps个脉冲间隔（浮点），单位为定时器计数（一个计数为unit_us微秒）"""
+    if curve_type not in PROFILE_TYPES:
+        raise ValueError(f"未知的曲线类型: {curve_type}")
+    jerk = max_jerk if curve_type == JERK_LIMITED else None
+    times = step_times(n_steps, start_speed, target_speed, max_accel, jerk, step_angle)
+    return _snap_integers(np.diff(times, prepend=0.0) * (1e6 / unit_us))
+
+
+def _speeds(curve_type, start, end, max_jerk, step_angle, unit_us):
+    """检查参数，把起始值和终止值换算为(起始速度, 目标速度, 加加速度)"""
+    if curve_type not in PROFILE_TYPES:
+        raise ValueError(f"未知的曲线类型: {curve_type}")
+    if start <= 0 or end <= 0:
+        raise ValueError("起始值和终止值必须大于0")
+    start_speed = float(curve_engine.angular_velocity(start, step_angle, unit_us))
+    target_speed = float(curve_engine.angular_velocity(end, step_angle, unit_us))
+    return start_speed, target_speed, (max_jerk if curve_type == JERK_LIMITED else None)
+
+
+def iter_chunks(curve_type, n_points, start, end, max_accel, max_jerk=None, step_angle=curve_engine.STEP_ANGLE,
+                quantization="四舍五入", chunk_size=curve_engine.CHUNK_SIZE, unit_us=curve_engine.PULSE_UNIT_US):
+    """与generate参数相同的生成器，每次给出不超过chunk_size个整数脉冲时长，内存占用与点数无关
+
+    每一步的到达时刻逐点独立求解，分块不影响浮点结果，三种取整方式的输出都与generate完全相同。
+    """
+    start_speed, target_speed, jerk = _speeds(curve_type, start, end, max_jerk, step_angle, unit_us)
+
+    def float_chunks():
+        previous = 0.0  # 上一块最后一步的到达时刻
+        for lo in range(0, n_points, chunk_size):
+            positions = step_angle * np.arange(lo + 1, min(lo + chunk_size, n_points) + 1)
+            times = _times_at(positions, start_speed, target_speed, max_accel, jerk)
+            yield _snap_integers(np.diff(times, prepend=previous) * (1e6 / unit_us))
+            previous = times[-1]
+
+    return curve_engine.quantize_chunks(float_chunks(), quantization)
+
+
+def profile_intervals(curve_type, n_points, start, end, max_accel, max_jerk=None, step_angle=curve_engine.STEP_ANGLE,
+                      unit_us=curve_engine.PULSE_UNIT_US):
+    """与generate参数相同，返回取整之前的浮点脉冲时长"""
+    start_speed, target_speed, _ = _speeds(curve_type, start, end, max_jerk, step_angle, unit_us)
+    return generate_profile(curve_type, n_points, start_speed, target_speed, max_accel, max_jerk, step_angle,
+                            unit_us)
+
+
+def generate(curve_type, n_points, start, end, max_accel, max_jerk=None, step_angle=curve_engine.STEP_ANGLE,
+             quantization="四舍五入", unit_us=curve_engine.PULSE_UNIT_US):
+    """与curve_engine.generate对应的整数脉冲时长数组，start/end为起始和目标的脉冲时长（计数）
+
+    step_angle为每个脉冲的角度，unit_us为一个计数的微秒数，速度和加速度都按这两者换算；
+    quantization为取整方式，见curve_engine.quantize。
+    """
+    profile = profile_intervals(curve_type, n_points, start, end, max_accel, max_jerk, step_angle, unit_us)
+    # 默认四舍五入，避免匀速段的92.9999被截断成92
+    return curve_engine.quantize(profile, quantization)
@@ -0,0 +1,76 @@
+"""按定时器参数把脉冲时长表积分为运动轨迹
+
+脉冲表中每个值是相邻两个脉冲之间的定时器计数。给定定时器时钟、预分频、步距角和细分数后：
+    - 每个脉冲的发出时刻 = 计数的累计和 × 计数周期，累计和用整数计算，长表也没有浮点累积误差；
+    - 第k个脉冲之后转过的角度 = k × 每个脉冲的角度（步距角/细分数）；
+    - 速度取每一步内的平均速度，放在该步的中点时刻，与curve_engine.angular_velocity的换算一致；
+    - 加速度和加加速度在非均匀的时间网格上做有限差分。
+全部计算都是整表向量化的，100万步的表耗时几十毫秒。
+"""
+import collections
+
+import numpy as np
+
+import curve_engine
+
+# 默认定时器参数：1MHz时钟、5分频，一个计数为5us，与curve_engine.PULSE_UNIT_US一致
+DEFAULT_TIMER_CLOCK = 1000000
+DEFAULT_PRESCALER = 5
+DEFAULT_MICROSTEPS = 1
+
+# 常见驱动器支持的细分数
+MICROSTEP_OPTIONS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+
+# 仿真结果：time/position为各脉冲的时刻(秒)和角度(度)；
+# velocity/acceleration/jerk为各步的速度(度/秒)、加速度(度/秒²)、加加速度(度/秒³)，对应时刻为mid_time
+MotionTrace = collections.namedtuple("MotionTrace",
+                                     ["time", "position", "mid_time", "velocity", "acceleration", "jerk"])
+
+
+def count_period(timer_clock=DEFAULT_TIMER_CLOCK, prescaler=DEFAULT_PRESCALER):
+    """一个定时器计数对应的时间(秒)"""
+    if timer_clock <= 0 or prescaler <= 0:
+        raise ValueError("定时器时钟和预分频必须大于0")
+    return prescaler / timer_clock
+
+
+def pulse_angle(step_angle=curve_engine.STEP_ANGLE, microsteps=DEFAULT_MICROSTEPS):
+    """每个脉冲转过的角度(度)"""
+    if step_angle <= 0 or microsteps < 1:
+        raise ValueError("步距角必须大于0，细分数不能小于1")
+    return step_angle / microsteps
+
+
+def step_velocity(pulse_table, timer_clock=DEFAULT_TIMER_CLOCK, prescaler=DEFAULT_PRESCALER,
+                  step_angle=curve_engine.STEP_ANGLE, microsteps=DEFAULT_MICROSTEPS):
+    """每一步内的平均角速度(度/秒)，支持标量和数组"""
+    return curve_engine.angular_velocity(pulse_table, pulse_angle(step_angle, microsteps),
+                                         count_period(timer_clock, prescaler) * 1e6)
+
+
+def _derivative(values, t):
+    """非均匀时间网格上的导数，点数少于2时为0"""
+    if len(values) < 2:
+        return np.zeros(len(values))
+    return np.gradient(values, t)
+
+
+def simulate(pulse_table, timer_clock=DEFAULT_TIMER_CLOCK, prescaler=DEFAULT_PRESCALER,
+             step_angle=curve_engine.STEP_ANGLE, microsteps=DEFAULT_MICROSTEPS):
+    """按脉冲表仿真电机运动，返回MotionTrace"""
+    counts = np.asarray(pulse_table)
+    if counts.ndim != 1:
+        raise ValueError("脉冲表必须是一维数组")
+    if len(counts) and counts.min() <= 0:
+        raise ValueError("脉冲时长必须大于0")
+    tick = count_period(timer_clock, prescaler)
+    angle = pulse_angle(step_angle, microsteps)
+
+    time = np.cumsum(counts, dtype=np.int64) * tick
+    period = counts * tick
+    mid_time = time - period / 2
+    position = angle * np.arange(1, len(counts) + 1)
+    velocity = curve_engine.angular_velocity(counts, angle, tick * 1e6)
+    acceleration = _derivative(velocity, mid_time)
+    jerk = _derivative(acceleration, mid_time)
+    return MotionTrace(time, position, mid_time, velocity, acceleration, jerk)
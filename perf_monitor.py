@@ -0,0 +1,153 @@
+"""界面性能监测
+
+现场出现卡顿时用来收集数据：记录生成、绘制、拖动刷新等调用的耗时，以及从输入事件到画布重绘的延迟，
+每一项只保留最近ROLLING_SAMPLES个样本，按固定的分桶统计直方图，可随时导出为JSON文件。
+关闭时被监测的函数只多一次属性判断，不计时也不分配内存。
+"""
+import collections
+import datetime
+import functools
+import json
+import time
+
+import numpy as np
+
+# 导出文件格式版本，字段不兼容地修改时加1
+STATS_VERSION = 1
+
+# 每一项保留的最近样本数
+ROLLING_SAMPLES = 1000
+
+# 直方图分桶的上边界(ms)，最后一个桶是大于最大边界的样本
+HISTOGRAM_EDGES_MS = [1, 2, 4, 8, 16, 33, 50, 100, 200, 500, 1000]
+
+# 计算帧率的时间窗口(秒)
+FPS_WINDOW_S = 1.0
+
+
+class RollingStats:
+    """最近若干个耗时样本(ms)，以及累计的记录次数"""
+
+    def __init__(self, size=ROLLING_SAMPLES):
+        self.samples = collections.deque(maxlen=size)
+        self.count = 0
+
+    def add(self, value):
+        self.samples.append(value)
+        self.count += 1
+
+    @property
+    def last(self):
+        return self.samples[-1] if self.samples else None
+
+    def percentile(self, q):
+        """窗口内样本的分位数，没有样本时返回None"""
+        if not self.samples:
+            return None
+        return float(np.percentile(np.fromiter(self.samples, float, len(self.samples)), q))
+
+    def histogram(self):
+        """窗口内样本在各分桶中的个数，长度比HISTOGRAM_EDGES_MS多1"""
+        values = np.fromiter(self.samples, float, len(self.samples))
+        buckets = np.searchsorted(HISTOGRAM_EDGES_MS, values, side="left")
+        return np.bincount(buckets, minlength=len(HISTOGRAM_EDGES_MS) + 1).tolist()
+
+    def summary(self):
+        values = np.fromiter(self.samples, float, len(self.samples))
+        result = {"count": self.count, "window": len(values)}
+        if len(values):
+            result.update({
+                "last": values[-1],
+                "min": float(values.min()),
+                "median": float(np.median(values)),
+                "mean": float(values.mean()),
+                "p95": float(np.percentile(values, 95)),
+                "p99": float(np.percentile(values, 99)),
+                "max": float(values.max()),
+            })
+        result["histogram"] = self.histogram()
+        return result
+
+
+class PerfMonitor:
+    """按名称收集耗时，并跟踪输入到重绘的延迟和帧率
+
+    enabled为False时record/mark_input/painted都立即返回。
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.stats = {}
+        self.input_time = None  # 最早一个还没有重绘的输入事件的时刻
+        self.paint_times = collections.deque(maxlen=1024)  # 最近的重绘时刻，用于计算帧率
+
+    def record(self, name, ms):
+        if not self.enabled:
+            return
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = RollingStats()
+        stats.add(ms)
+
+    def get(self, name):
+        """按名称取统计，没有记录过时返回None"""
+        return self.stats.get(name)
+
+    def mark_input(self):
+        """记录一个会引起重绘的输入事件；之前的输入还没重绘时保留较早的时刻"""
+        if self.enabled and self.input_time is None:
+            self.input_time = time.perf_counter()
+
+    def painted(self):
+        """画布完成一次重绘：记录帧时刻，有待处理的输入时记录延迟"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.paint_times.append(now)
+        if self.input_time is not None:
+            self.record("latency", (now - self.input_time) * 1000)
+            self.input_time = None
+
+    def fps(self):
+        """最近FPS_WINDOW_S秒内的重绘次数换算的帧率"""
+        start = time.perf_counter() - FPS_WINDOW_S
+        return sum(1 for t in self.paint_times if t >= start) / FPS_WINDOW_S
+
+    def clear(self):
+        self.stats.clear()
+        self.input_time = None
+        self.paint_times.clear()
+
+    def report(self, context=None):
+        """全部统计，context为附加的说明信息（例如当前曲线的点数）"""
+        return {
+            "version": STATS_VERSION,
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "unit": "ms",
+            "histogram_edges": HISTOGRAM_EDGES_MS,
+            "fps": self.fps(),
+            "context": context or {},
+            "stats": {name: stats.summary() for name, stats in self.stats.items()},
+        }
+
+    def dump(self, path, context=None):
+        """把统计写成JSON文件"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(context), f, ensure_ascii=False, indent=2)
+
+
+def timed(name):
+    """方法装饰器：所属对象的perf（PerfMonitor）开启时记录每次调用的耗时"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            monitor = self.perf
+            if not monitor.enabled:
+                return func(self, *args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(self, *args, **kwargs)
+            finally:
+                monitor.record(name, (time.perf_counter() - start) * 1000)
+        return wrapper
+    return decorator
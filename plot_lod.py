@@ -0,0 +1,113 @@
+"""长曲线的分级显示（LOD）
+
+屏幕上一个像素宽度内往往有成百上千个点，逐点绘制既慢又看不清。
+这里把可见区间按像素分桶，每个桶只保留最小值和最大值两个点，
+画出来的包络线与逐点绘制在屏幕上看起来一致，绘制的点数只与画布宽度有关。
+MinMaxPyramid预先按2的幂逐级合并最小/最大值，缩放和平移时直接从合适的一级取数据，
+耗时只与画布宽度有关，与数组长度无关。
+"""
+import numpy as np
+
+# 可见点数不超过该值时才显示可点击的散点标记
+MARKER_LIMIT = 500
+
+
+def visible_window(xlim, n_points):
+    """根据横坐标显示范围计算可见的下标区间[lo, hi)"""
+    lo = max(0, int(np.floor(xlim[0])))
+    hi = min(n_points, int(np.ceil(xlim[1])) + 1)
+    return lo, max(lo, hi)
+
+
+def minmax_envelope(values, n_bins, offset=0):
+    """把values分成n_bins个桶，每个桶保留最小值和最大值，返回(x, y)
+
+    点数不超过2*n_bins时原样返回。每个桶的两个点放在桶的首尾下标处，
+    下降的桶先画最大值、上升的桶先画最小值，单调曲线的形状与原曲线完全一致。
+    offset为values[0]对应的下标。
+    """
+    values = np.asarray(values)
+    n = len(values)
+    n_bins = max(1, int(n_bins))
+    if n <= 2 * n_bins:
+        return offset + np.arange(n), values
+
+    starts = np.arange(n_bins) * n // n_bins
+    ends = np.append(starts[1:], n) - 1
+    mins = np.minimum.reduceat(values, starts)
+    maxs = np.maximum.reduceat(values, starts)
+    falling = values[starts] > values[ends]
+
+    x = np.column_stack([starts, ends]).ravel() + offset
+    y = np.column_stack([np.where(falling, maxs, mins), np.where(falling, mins, maxs)]).ravel()
+    return x, y
+
+
+class MinMaxPyramid:
+    """逐级合并的最小/最大值金字塔，第k级每个桶覆盖2**k个点
+
+    values在外部被修改后调用update(idx)，只更新该点所在的各级桶（O(log n)）。
+    """
+
+    def __init__(self, values):
+        self.values = values
+        self.levels = []  # 第1级开始的(mins, maxs)，第0级就是values本身
+        mins = maxs = values
+        while len(mins) > 1:
+            pairs = np.arange(0, len(mins), 2)
+            mins = np.minimum.reduceat(mins, pairs)
+            maxs = np.maximum.reduceat(maxs, pairs)
+            self.levels.append((mins, maxs))
+
+    def copy(self):
+        """复制values和各级桶，副本的修改不影响原金字塔"""
+        clone = MinMaxPyramid.__new__(MinMaxPyramid)
+        clone.values = self.values.copy()
+        clone.levels = [(mins.copy(), maxs.copy()) for mins, maxs in self.levels]
+        return clone
+
+    def update(self, idx):
+        """values[idx]修改后更新各级桶"""
+        child_min = child_max = self.values
+        for k, (mins, maxs) in enumerate(self.levels, 1):
+            i = idx >> k
+            lo, hi = 2 * i, min(2 * i + 2, len(child_min))
+            mins[i] = child_min[lo:hi].min()
+            maxs[i] = child_max[lo:hi].max()
+            child_min, child_max = mins, maxs
+
+    def update_range(self, lo, hi):
+        """values[lo:hi]修改后更新各级桶，每一级只重算覆盖该区间的桶"""
+        child_min = child_max = self.values
+        for k, (mins, maxs) in enumerate(self.levels, 1):
+            a, b = lo >> k, ((hi - 1) >> k) + 1
+            end = min(2 * b, len(child_min))
+            pairs = np.arange(0, end - 2 * a, 2)
+            mins[a:b] = np.minimum.reduceat(child_min[2 * a:end], pairs)
+            maxs[a:b] = np.maximum.reduceat(child_max[2 * a:end], pairs)
+            child_min, child_max = mins, maxs
+
+    def envelope(self, lo, hi, n_bins):
+        """下标区间[lo, hi)按n_bins个桶抽稀后的(x, y)，与minmax_envelope的结果形状相同"""
+        n_bins = max(1, int(n_bins))
+        n = hi - lo
+        # 选桶宽不超过 n/(2*n_bins) 的最粗一级，参与计算的桶数在2*n_bins到4*n_bins之间
+        k = int(np.log2(n / (2 * n_bins))) if n > 4 * n_bins else 0
+        if k == 0:
+            return minmax_envelope(self.values[lo:hi], n_bins, lo)
+
+        mins, maxs = self.levels[k - 1]
+        a, b = lo >> k, ((hi - 1) >> k) + 1
+        m = b - a
+        starts = np.arange(n_bins) * m // n_bins
+        bin_min = np.minimum.reduceat(mins[a:b], starts)
+        bin_max = np.maximum.reduceat(maxs[a:b], starts)
+
+        # 每个大桶的首尾下标，两端截断到可见区间（两端的桶可能多包含几个区间外的点，只影响边缘一个像素）
+        first = np.maximum((a + starts) << k, lo)
+        last = np.minimum(((a + np.append(starts[1:], m)) << k) - 1, hi - 1)
+        falling = self.values[first] > self.values[last]
+
+        x = np.column_stack([first, last]).ravel()
+        y = np.column_stack([np.where(falling, bin_max, bin_min), np.where(falling, bin_min, bin_max)]).ravel()
+        return x, y
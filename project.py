@@ -0,0 +1,159 @@
+"""曲线工程文件
+
+一个工程保存多条曲线的名称、生成参数、脉冲时长数组和编辑历史。文件是未压缩的.npz（zip格式）：
+元数据以JSON存放在一个成员中，每条曲线的数组和编辑历史各自是独立的成员。
+打开工程时只读取zip目录和元数据，某条曲线的数组和历史在第一次访问时才从文件中读出，
+曲线再多、再长，打开工程也几乎不耗时。数组按取值范围存为能容纳全部数值的最小整数类型。
+"""
+import json
+import os
+
+import numpy as np
+
+import c_array
+import edit_history
+
+# 工程文件格式版本，格式不兼容地修改时加1
+FORMAT_VERSION = 1
+
+# 工程文件的扩展名
+PROJECT_SUFFIX = ".npz"
+
+# 存放元数据JSON的成员名
+_META_KEY = "meta"
+
+# 编辑历史在文件中的各个成员，与EditHistory.to_arrays的键一致
+_HISTORY_KEYS = [f"{stack}_{part}" for stack in ("undo", "redo")
+                 for part in ("lengths", "indices", "old", "new")]
+
+
+class Profile:
+    """工程中的一条曲线
+
+    params为生成参数字典（可以为None，例如导入的数组），history为EditHistory。
+    从文件打开时数组和历史都还没有读取，访问array/history属性时才读出。
+    """
+
+    def __init__(self, name, array, params=None, history=None):
+        self.name = name
+        self.params = params
+        self._array = None if array is None else np.asarray(array, dtype=np.int64)
+        self._history = history
+        self._source = None  # 延迟读取时的(NpzFile, 成员名前缀)
+        self.length = 0 if array is None else len(self._array)
+
+    @classmethod
+    def _lazy(cls, name, params, length, source, prefix):
+        profile = cls(name, None, params)
+        profile._source = (source, prefix)
+        profile.length = length
+        return profile
+
+    @property
+    def loaded(self):
+        """数组是否已经读入内存"""
+        return self._array is not None
+
+    @property
+    def array(self):
+        if self._array is None and self._source is not None:
+            source, prefix = self._source
+            self._array = source[prefix + "data"].astype(np.int64)
+        return self._array
+
+    @property
+    def history(self):
+        if self._history is None:
+            self._history = edit_history.EditHistory()
+            if self._source is not None:
+                source, prefix = self._source
+                if prefix + _HISTORY_KEYS[0] in source.files:
+                    self._history.load_arrays({key: source[prefix + key] for key in _HISTORY_KEYS})
+        return self._history
+
+    def _materialize(self):
+        """把延迟读取的数组和历史全部读入内存，之后不再依赖源文件"""
+        self.array
+        self.history
+        self._source = None
+
+
+class Project:
+    """按名称排列的曲线集合，保持加入的先后顺序"""
+
+    def __init__(self):
+        self.profiles = {}
+        self.path = None
+        self._source = None  # 打开工程文件得到的NpzFile
+
+    def names(self):
+        return list(self.profiles)
+
+    def get(self, name):
+        """按名称取曲线，不存在时返回None"""
+        return self.profiles.get(name)
+
+    def put(self, name, array, params=None, history=None):
+        """加入一条曲线，同名时替换原来的曲线（位置不变）"""
+        if not name:
+            raise ValueError("曲线名称不能为空")
+        profile = Profile(name, array, params, history)
+        self.profiles[name] = profile
+        return profile
+
+    def remove(self, name):
+        self.profiles.pop(name, None)
+
+    def save(self, path):
+        """保存到path：先写临时文件再替换，覆盖正在读取的同一个文件也是安全的"""
+        arrays = {}
+        meta = {"version": FORMAT_VERSION, "profiles": []}
+        for i, profile in enumerate(self.profiles.values()):
+            prefix = f"p{i}_"
+            values = profile.array
+            arrays[prefix + "data"] = values.astype(c_array.narrowest_dtype(values))
+            history = profile.history.to_arrays()
+            if len(history["undo_lengths"]) or len(history["redo_lengths"]):
+                for key in _HISTORY_KEYS:
+                    arrays[prefix + key] = history[key]
+            meta["profiles"].append({"name": profile.name, "params": profile.params,
+                                     "length": len(values), "prefix": prefix})
+        arrays[_META_KEY] = np.frombuffer(json.dumps(meta, ensure_ascii=False).encode("utf-8"), dtype=np.uint8)
+
+        # 新文件写好之前不能关闭旧文件，延迟读取的曲线还要从中读数据
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        for profile in self.profiles.values():
+            profile._materialize()
+        self.close()
+        os.replace(tmp_path, path)
+        self.path = path
+
+    def close(self):
+        """关闭打开的工程文件；还没读取的曲线之后不能再访问"""
+        if self._source is not None:
+            self._source.close()
+            self._source = None
+
+
+def load(path):
+    """打开工程文件，只读取元数据，曲线数组在访问时才读出"""
+    source = np.load(path)
+    try:
+        if _META_KEY not in source.files:
+            raise ValueError(f"{path} 不是曲线工程文件")
+        meta = json.loads(source[_META_KEY].tobytes().decode("utf-8"))
+        if meta.get("version", 0) > FORMAT_VERSION:
+            raise ValueError(f"工程文件版本{meta['version']}过新，当前程序只支持到版本{FORMAT_VERSION}")
+    except (ValueError, KeyError):
+        source.close()
+        raise
+
+    project = Project()
+    project.path = path
+    project._source = source
+    for item in meta["profiles"]:
+        project.profiles[item["name"]] = Profile._lazy(item["name"], item.get("params"), item["length"],
+                                                       source, item["prefix"])
+    return project
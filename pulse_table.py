@@ -0,0 +1,65 @@
+"""磁盘上的脉冲时长表（内存映射）
+
+连续旋转测试台等场合的曲线有几百万步，整张表放在内存中再复制几份代价很大。
+这里把表存为磁盘上的.npy文件，以uint16/uint32内存映射的方式访问：
+生成时逐块写入，导出时逐块读取，切片不复制数据，内存占用与表的长度无关。
+"""
+import numpy as np
+
+import curve_engine
+
+# 数据表文件的扩展名
+TABLE_SUFFIX = ".npy"
+
+# 数据表支持的元素类型
+TABLE_DTYPES = {"uint16": np.uint16, "uint32": np.uint32}
+DEFAULT_DTYPE = "uint16"
+
+
+def _table_dtype(dtype):
+    try:
+        return np.dtype(TABLE_DTYPES[dtype])
+    except KeyError:
+        raise ValueError(f"数据表只支持 {'/'.join(TABLE_DTYPES)} 类型") from None
+
+
+def create(path, n_points, dtype=DEFAULT_DTYPE):
+    """创建长度为n_points的数据表文件，返回可写的内存映射数组"""
+    if n_points < 0:
+        raise ValueError("点数不能为负数")
+    return np.lib.format.open_memmap(path, mode="w+", dtype=_table_dtype(dtype), shape=(n_points,))
+
+
+def open_table(path, writable=False):
+    """以内存映射方式打开数据表，只读取文件头"""
+    table = np.load(path, mmap_mode="r+" if writable else "r")
+    if table.ndim != 1 or table.dtype.kind not in "iu":
+        raise ValueError(f"{path} 不是一维整数数据表")
+    return table
+
+
+def fill_table(path, n_points, chunks, dtype=DEFAULT_DTYPE):
+    """把逐块给出的n_points个脉冲时长写入数据表文件，返回只读的内存映射数组"""
+    info = np.iinfo(_table_dtype(dtype))
+
+    def checked():
+        for chunk in chunks:
+            if len(chunk) and (chunk.min() < info.min or chunk.max() > info.max):
+                raise ValueError(f"脉冲时长超出{dtype}的取值范围")
+            yield chunk
+
+    table = create(path, n_points, dtype)
+    written = curve_engine.write_chunks(table, checked())
+    if written != n_points:
+        raise ValueError(f"只生成了{written}个点，少于数据表长度{n_points}")
+    table.flush()
+    del table
+    return open_table(path)
+
+
+def generate_table(path, curve_type, n_points, start, end, effect_range=(0.0, 1.0), start_size=10, end_size=10,
+                   power=2.0, quantization="截断", dtype=DEFAULT_DTYPE, chunk_size=curve_engine.CHUNK_SIZE):
+    """按curve_engine.generate的参数逐块生成曲线并写入数据表文件，返回只读的内存映射数组"""
+    return fill_table(path, n_points, curve_engine.iter_chunks(curve_type, n_points, start, end, effect_range,
+                                                               start_size, end_size, power, quantization,
+                                                               chunk_size), dtype)
@@ -0,0 +1,84 @@
+"""区域编辑：对一段连续的点一次性做向量化变形
+
+所有函数都接收区间内的原始数值，返回同样长度的浮点结果，由调用方取整、限幅后写回，
+这样一次操作只产生一次写回、一条撤销记录和一次局部重绘。
+"""
+import numpy as np
+
+import curve_engine
+import motion_profile
+
+# 区域操作类型（与界面下拉框中的名称一致）
+GAUSSIAN = "高斯凸起"
+SCALE = "缩放"
+OFFSET = "偏移"
+REFIT = "重新拟合"
+OPERATIONS = [GAUSSIAN, SCALE, OFFSET, REFIT]
+
+
+def gaussian_weights(n, center, radius):
+    """长度为n的高斯权重，中心在下标center处为1，radius处衰减到约1%（radius = 3σ）"""
+    sigma = max(radius, 1) / 3
+    return np.exp(-0.5 * ((np.arange(n) - center) / sigma)**2)
+
+
+def gaussian_bump(values, center, radius, amount):
+    """以center为中心叠加高度为amount的高斯凸起（amount为负时为凹陷）"""
+    return np.asarray(values, dtype=float) + amount * gaussian_weights(len(values), center, radius)
+
+
+def scale(values, factor):
+    """区间内的值整体乘以factor"""
+    return np.asarray(values, dtype=float) * factor
+
+
+def offset(values, amount):
+    """区间内的值整体加上amount"""
+    return np.asarray(values, dtype=float) + amount
+
+
+def pin_endpoints(values, start, end):
+    """把曲线线性缩放到首尾恰为start和end，保持形状；首尾相等的曲线改为叠加线性修正"""
+    values = np.asarray(values, dtype=float)
+    first, last = values[0], values[-1]
+    if abs(last - first) > 1e-9:
+        return start + (values - first) * ((end - start) / (last - first))
+    t = np.linspace(0.0, 1.0, len(values))
+    return values + (start - first) * (1 - t) + (end - last) * t
+
+
+def refit(values, curve_type, power=2.0, max_accel=motion_profile.DEFAULT_MAX_ACCEL,
+          max_jerk=motion_profile.DEFAULT_MAX_JERK, step_angle=curve_engine.STEP_ANGLE,
+          unit_us=curve_engine.PULSE_UNIT_US):
+    """以区间首尾两点的值为起止值，按指定曲线类型重新生成整个区间
+
+    运动学曲线的第一步是起步过程的平均间隔，区间较短时也可能还没变速到终止值，
+    生成后缩放到首尾与原值一致，区间边界处不会跳变。
+    """
+    values = np.asarray(values)
+    n = len(values)
+    if n < 2:
+        return values.astype(float)
+    start, end = values[0], values[-1]
+    if curve_type in motion_profile.PROFILE_TYPES:
+        profile = motion_profile.profile_intervals(curve_type, n, start, end, max_accel, max_jerk, step_angle, unit_us)
+        return pin_endpoints(profile, float(start), float(end))
+    # 区域内不再额外做首尾平滑过渡
+    return curve_engine.generate(curve_type, n, start, end, start_size=0, end_size=0,
+                                 power=power).astype(float)
+
+
+def apply_operation(operation, values, amount, curve_type="线性", power=2.0,
+                    max_accel=motion_profile.DEFAULT_MAX_ACCEL, max_jerk=motion_profile.DEFAULT_MAX_JERK,
+                    step_angle=curve_engine.STEP_ANGLE, unit_us=curve_engine.PULSE_UNIT_US):
+    """按操作名称对整个区间做变形，高斯凸起以区间中点为中心、覆盖整个区间"""
+    if operation == GAUSSIAN:
+        n = len(values)
+        return gaussian_bump(values, (n - 1) / 2, (n - 1) / 2, amount)
+    if operation == SCALE:
+        return scale(values, amount)
+    if operation == OFFSET:
+        return offset(values, amount)
+    if operation == REFIT:
+        return refit(values, curve_type, power, max_accel, max_jerk, step_angle, unit_us)
+    raise ValueError(f"未知的区域操作: {operation}")
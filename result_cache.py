@@ -0,0 +1,53 @@
+"""生成结果的LRU缓存
+
+以完整的参数元组为键缓存生成的曲线及其派生数据，切换回之前用过的参数时直接取出，不再重新计算。
+按条数和总点数两个上限淘汰最久未使用的记录，长曲线不会让缓存无限占用内存。
+"""
+import collections
+
+# 默认最多缓存的记录条数和总点数
+MAX_ENTRIES = 32
+MAX_POINTS = 4000000
+
+
+class ResultCache:
+    """最近最少使用(LRU)缓存，值为任意对象，点数由调用方在put时给出"""
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_points=MAX_POINTS):
+        self.max_entries = max_entries
+        self.max_points = max_points
+        self.entries = collections.OrderedDict()  # 键 -> (值, 点数)，最近使用的在末尾
+        self.point_count = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """取出缓存的值并标记为最近使用，不存在时返回None"""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, value, n_points):
+        """加入一条记录，超出上限时淘汰最久未使用的记录；单条超过总点数上限的记录不缓存"""
+        if key in self.entries:
+            self.point_count -= self.entries.pop(key)[1]
+        if n_points > self.max_points:
+            return
+        self.entries[key] = (value, n_points)
+        self.point_count += n_points
+        while len(self.entries) > self.max_entries or self.point_count > self.max_points:
+            self.point_count -= self.entries.popitem(last=False)[1][1]
+
+    def clear(self):
+        self.entries.clear()
+        self.point_count = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
@@ -1,21 +1,157 @@
-import sys
+import os
 import re
+import sys
 import numpy as np
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                            QHBoxLayout, QPushButton, QLabel, QTextEdit, 
-                           QComboBox, QSpinBox, QGroupBox, QMessageBox, QDoubleSpinBox)
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QIcon
+                           QComboBox, QSpinBox, QGroupBox, QMessageBox, QDoubleSpinBox,
+                           QInputDialog, QFileDialog, QLineEdit, QCheckBox, QShortcut)
+from PyQt5.QtCore import Qt, QEvent, QTimer, QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QIcon, QKeySequence
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
+from matplotlib.patches import Rectangle
 import matplotlib
 from matplotlib.widgets import PolygonSelector
 
+import c_array
+import constraints
+import curve_engine
+import edit_history
+import motion_profile
+import motion_sim
+import perf_monitor
+import plot_lod
+import project
+import region_edit
+import result_cache
+
 # 设置matplotlib支持中文显示
 matplotlib.rcParams['font.sans-serif'] = ['SimHei']  # 用来正常显示中文标签
 matplotlib.rcParams['axes.unicode_minus'] = False  # 用来正常显示负号
 
+# 界面刷新间隔(ms)，鼠标移动事件按帧合并
+FRAME_INTERVAL_MS = 16
+
+# 滚轮每格的缩放倍数，以及放大后最少显示的点数
+ZOOM_STEP = 1.25
+MIN_VIEW_POINTS = 10
+
+# 脉冲时长允许的取值范围
+VALUE_MIN = 6
+VALUE_MAX = 98
+
+# 仿真窗口的刷新间隔(ms)，连续编辑时合并为一次仿真
+SIMULATION_REFRESH_MS = 100
+
+# 超过该点数的数组导出时直接逐块写入文件，不放入文本框
+EXPORT_TEXT_LIMIT = 100000
+
+# 实时预览的防抖延时(ms)：参数停止变化这么久之后才开始生成
+PREVIEW_DELAY_MS = 150
+
+# 曲线有手动修改时实时预览暂停的提示
+PREVIEW_PAUSED_TEXT = "曲线已手动修改，实时预览已暂停；点击\"生成曲线\"替换当前曲线（修改将丢失）"
+
+# 性能叠加层的刷新间隔(ms)
+OVERLAY_REFRESH_MS = 500
+
+
+def compute_curve(params):
+    """按生成参数计算曲线及派生数据，返回(金字塔, 角速度, 旋转一圈耗时)，数组为金字塔的values
+
+    不访问任何界面控件，可以在工作线程中调用。
+    """
+    curve_type = params["curve_type"]
+    units = (params["pulse_angle"], params["unit_us"])
+    if curve_type in motion_profile.PROFILE_TYPES:
+        arr = motion_profile.generate(curve_type, params["n_points"], params["start"], params["end"],
+                                      params["max_accel"], params["max_jerk"], units[0],
+                                      quantization=params["quantization"], unit_us=units[1])
+    else:
+        arr = curve_engine.generate(curve_type, params["n_points"], params["start"], params["end"],
+                                    params["effect_range"], params["start_size"], params["end_size"],
+                                    params["power"], params["quantization"])
+    arr = np.asarray(arr, dtype=np.int64)
+    return (plot_lod.MinMaxPyramid(arr), curve_engine.angular_velocity(arr, *units),
+            curve_engine.full_circle_time(arr, *units))
+
+
+class PreviewSignals(QObject):
+    """预览任务的信号，在工作线程中发出，由主线程的槽函数处理"""
+    finished = pyqtSignal(int, object, object)  # (请求编号, 缓存键, compute_curve的结果)
+    failed = pyqtSignal(int, str)  # (请求编号, 错误信息)
+
+
+class PreviewTask(QRunnable):
+    """在线程池中生成一次预览；开始前和完成后检查请求是否已过期，过期的结果直接丢弃"""
+
+    def __init__(self, request_id, key, params, is_current):
+        super().__init__()
+        self.request_id = request_id
+        self.key = key
+        self.params = params
+        self.is_current = is_current
+        self.signals = PreviewSignals()
+
+    def run(self):
+        if not self.is_current(self.request_id):
+            return
+        # 线程池会吞掉未捕获的异常，任何错误都要通知界面，否则状态栏一直停在"正在生成预览"
+        try:
+            derived = compute_curve(self.params)
+        except Exception as e:
+            self.signals.failed.emit(self.request_id, str(e))
+            return
+        if self.is_current(self.request_id):
+            self.signals.finished.emit(self.request_id, self.key, derived)
+
+
+class SimulationWindow(QWidget):
+    """显示仿真得到的位置/速度/加速度/加加速度随时间变化的曲线"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent, Qt.Window)
+        self.setWindowTitle("运动仿真")
+        self.resize(800, 700)
+        layout = QVBoxLayout()
+        self.figure = Figure(figsize=(8, 7), dpi=100)
+        self.canvas = FigureCanvas(self.figure)
+        layout.addWidget(self.canvas)
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+        self.setLayout(layout)
+
+        labels = ["位置(度)", "速度(度/秒)", "加速度(度/秒²)", "加加速度(度/秒³)"]
+        self.axes = self.figure.subplots(len(labels), 1, sharex=True)
+        self.lines = []
+        for ax, label in zip(self.axes, labels):
+            ax.set_ylabel(label)
+            ax.grid(True)
+            self.lines.append(ax.plot([], [], 'b-', linewidth=1)[0])
+        self.axes[-1].set_xlabel("时间(ms)")
+        self.figure.tight_layout()
+
+    def set_trace(self, trace):
+        """显示一次仿真结果，长表按画布宽度抽稀"""
+        n_bins = max(1, int(self.axes[0].bbox.width))
+        series = [(trace.time, trace.position), (trace.mid_time, trace.velocity),
+                  (trace.mid_time, trace.acceleration), (trace.mid_time, trace.jerk)]
+        for ax, line, (t, values) in zip(self.axes, self.lines, series):
+            idx, y = plot_lod.minmax_envelope(values, n_bins)
+            line.set_data(t[idx] * 1000, y)
+            ax.relim()
+            ax.autoscale_view()
+        total = trace.time[-1] * 1000 if len(trace.time) else 0.0
+        self.status_label.setText(f"共{len(trace.time)}个脉冲 | 总时间: {total:.3f} ms")
+        self.canvas.draw_idle()
+
+    def show_error(self, message):
+        """脉冲表无法仿真时显示原因"""
+        self.status_label.setText(message)
+
+
 class StepperCurveGenerator(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -50,16 +186,57 @@ class StepperCurveGenerator(QMainWindow):
         self.canvas.setMouseTracking(True)
         self.ax = self.figure.add_subplot(111)
         
+        # 性能监测，默认关闭；开启后画布的重绘事件经过事件过滤器计算帧率和输入延迟
+        self.perf = perf_monitor.PerfMonitor()
+        self.perf_overlay = QLabel(self.canvas)
+        self.perf_overlay.setStyleSheet("background-color: rgba(0, 0, 0, 160); color: white; "
+                                        "font-family: monospace; padding: 4px;")
+        self.perf_overlay.move(8, 8)
+        self.perf_overlay.hide()
+        self.perf_overlay_timer = QTimer(self)
+        self.perf_overlay_timer.setInterval(OVERLAY_REFRESH_MS)
+        self.perf_overlay_timer.timeout.connect(self.refresh_perf_overlay)
+        
+        # 速度换算的时间基准：(每个脉冲的角度, 一个计数的微秒数)，由定时器和电机参数决定
+        self.motion_units = (curve_engine.STEP_ANGLE, curve_engine.PULSE_UNIT_US)
+        
         # 左侧控制面板
         control_panel = self.create_control_panel()
+        self.motion_units = self.read_motion_units()
         layout.addWidget(control_panel, stretch=1)
         
         # 右侧图表面板
         plot_panel = self.create_plot_panel()
         layout.addWidget(plot_panel, stretch=2)
         
-        # 初始化数据
-        self.current_array = []
+        # 运动仿真窗口，打开后数组变化时自动刷新
+        self.simulation_window = None
+        self.simulation_timer = QTimer(self)
+        self.simulation_timer.setSingleShot(True)
+        self.simulation_timer.setInterval(SIMULATION_REFRESH_MS)
+        self.simulation_timer.timeout.connect(self.refresh_simulation)
+        
+        # 实时预览：参数变化先经过防抖定时器，再交给单线程的线程池生成，只显示最新一次请求的结果
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(PREVIEW_DELAY_MS)
+        self.preview_timer.timeout.connect(self.start_preview)
+        self.preview_pool = QThreadPool(self)
+        self.preview_pool.setMaxThreadCount(1)
+        self.preview_request = 0  # 最新一次预览请求的编号，编号不同的结果已过期
+        self.preview_task = None
+        
+        # 初始化数据：脉冲时长数组及其派生数据
+        self.current_array = np.zeros(0, dtype=np.int64)
+        self.angular_velocity = np.zeros(0)  # 每一步的角速度(度/秒)
+        self.full_circle_times = np.zeros(0)  # 按每一步的速度旋转一圈的耗时(ms)
+        self.total_pulse = 0  # 所有脉冲时长之和
+        self.pulse_sums = curve_engine.PrefixSum(self.current_array)  # 脉冲时长的前缀和，用于累计耗时
+        self.pulse_lod = plot_lod.MinMaxPyramid(self.current_array)  # 抽稀显示用的最小/最大值金字塔
+        self.history = edit_history.EditHistory()  # 撤销/重做记录
+        self.generation_cache = result_cache.ResultCache()  # 按生成参数缓存的(金字塔, 角速度, 旋转一圈耗时)
+        self.project = project.Project()  # 当前打开的曲线工程
+        self.current_params = None  # 当前数组的生成参数，导入的数组为None
         
         # 用于拖拽修改的变量
         self.dragging = False
@@ -68,9 +245,47 @@ class StepperCurveGenerator(QMainWindow):
         self.scatter_plot = None
         self.line_plot = None
         self.highlight_point = None
+        self.velocity_ax = None  # 角速度坐标轴
         self.velocity_line = None
-        self.cursor_annotation = None  # 鼠标位置的注释
-        self.point_info_text = None  # 选中点的信息文本
+        self.value_annotation = None  # 选中点的数值标签
+        self.plot_signature = None  # 当前图元对应的(数组长度, 生效范围)，变化时才重建
+        self.line_offset = None  # 主曲线第一个点对应的下标，曲线按包络抽稀显示时为None
+        self.marker_offset = None  # 第一个散点对应的下标，不显示散点时为None
+        
+        # 视图缩放和平移
+        self.full_view = None  # 完整显示数组时的横坐标范围
+        self.overview_ax = None  # 底部显示完整曲线的缩略图
+        self.overview_line = None
+        self.view_span = None  # 缩略图中标出当前视图的矩形
+        self.pan_start = None  # 平移开始时的(鼠标屏幕X, 横坐标范围)
+        self.overview_dragging = False  # 正在缩略图中拖动
+        
+        # 笔刷编辑：拖动时以按下的点为中心整体变形一段区域
+        self.brush_state = None  # (中心下标, 区域起点, 按下时区域内的原始值, 取值范围)
+        self.pending_brush = None  # 待应用的鼠标高度
+        
+        # 约束检查结果：违规点的下标（升序），未开启检查时为None
+        self.violations = None
+        self.violation_markers = None
+        
+        # 拖动时blit刷新用的缓存背景和局部图元
+        self.drag_background = None
+        self.drag_index = None
+        self.drag_bin = None  # 抽稀显示时拖动点所在包络桶的(首下标, 末下标, 左邻顶点, 右邻顶点)
+        self.drag_line = None
+        self.drag_markers = None
+        self.drag_velocity_line = None
+        
+        # 鼠标移动事件合并：每帧最多刷新一次界面
+        self.pending_hover = None  # 待显示的鼠标位置(x, y)
+        self.pending_drag = None  # 待应用的拖动结果(下标, 新值, 鼠标Y)
+        self.last_hover = None
+        self.last_drag_target = None
+        self.pending_view = None  # 待应用的横坐标范围
+        self.frame_timer = QTimer(self)
+        self.frame_timer.setSingleShot(True)
+        self.frame_timer.setInterval(FRAME_INTERVAL_MS)
+        self.frame_timer.timeout.connect(self.flush_pending_updates)
         
         # 连接鼠标事件 (增加事件监听能力)
         self.cidpress = self.canvas.mpl_connect('button_press_event', self.on_mouse_press)
@@ -79,7 +294,13 @@ class StepperCurveGenerator(QMainWindow):
         self.cidpick = self.canvas.mpl_connect('pick_event', self.on_pick)
         
         # 添加键盘事件支持
-        self.canvas.mpl_connect('key_press_event', self.on_key_press)
+        self.cidkey = self.canvas.mpl_connect('key_press_event', self.on_key_press)
+        self.cidresize = self.canvas.mpl_connect('resize_event', self.on_canvas_resize)
+        self.cidscroll = self.canvas.mpl_connect('scroll_event', self.on_scroll)
+        
+        # 撤销/重做快捷键（Ctrl+Z / Ctrl+Y），文本框有焦点时由文本框自己处理
+        QShortcut(QKeySequence.Undo, self, self.undo_edit)
+        QShortcut(QKeySequence.Redo, self, self.redo_edit)
         
         # 状态标签
         self.status_label = QLabel("准备就绪")
@@ -111,7 +332,7 @@ class StepperCurveGenerator(QMainWindow):
         curve_type_layout = QHBoxLayout()
         curve_type_layout.addWidget(QLabel("曲线类型:"))
         self.curve_type = QComboBox()
-        self.curve_type.addItems(["线性", "指数", "S型", "余弦", "抛物线", "自定义幂函数"])
+        self.curve_type.addItems(curve_engine.CURVE_TYPES + motion_profile.PROFILE_TYPES)
         curve_type_layout.addWidget(self.curve_type)
         param_layout.addLayout(curve_type_layout)
         
@@ -119,7 +340,7 @@ class StepperCurveGenerator(QMainWindow):
         points_layout = QHBoxLayout()
         points_layout.addWidget(QLabel("点数:"))
         self.points_spin = QSpinBox()
-        self.points_spin.setRange(10, 500)
+        self.points_spin.setRange(10, 1000000)
         self.points_spin.setValue(98)
         points_layout.addWidget(self.points_spin)
         param_layout.addLayout(points_layout)
@@ -181,6 +402,42 @@ class StepperCurveGenerator(QMainWindow):
         power_layout.addWidget(self.power_value)
         param_layout.addLayout(power_layout)
         
+        # 按运动学生成时的加速度和加加速度限制
+        accel_layout = QHBoxLayout()
+        accel_layout.addWidget(QLabel("最大加速度:"))
+        self.max_accel = QDoubleSpinBox()
+        self.max_accel.setDecimals(0)
+        self.max_accel.setRange(1, 1e12)
+        self.max_accel.setValue(motion_profile.DEFAULT_MAX_ACCEL)
+        self.max_accel.setSingleStep(1e6)
+        self.max_accel.setSuffix(" °/s²")
+        accel_layout.addWidget(self.max_accel)
+        
+        accel_layout.addWidget(QLabel("最大加加速度:"))
+        self.max_jerk = QDoubleSpinBox()
+        self.max_jerk.setDecimals(0)
+        self.max_jerk.setRange(1, 1e15)
+        self.max_jerk.setValue(motion_profile.DEFAULT_MAX_JERK)
+        self.max_jerk.setSingleStep(1e9)
+        self.max_jerk.setSuffix(" °/s³")
+        accel_layout.addWidget(self.max_jerk)
+        param_layout.addLayout(accel_layout)
+        # 只有运动学曲线使用，选中对应曲线类型时才启用
+        self.max_accel.setEnabled(False)
+        self.max_jerk.setEnabled(False)
+        
+        # 浮点曲线转换为整数脉冲时长的方式
+        quantize_layout = QHBoxLayout()
+        quantize_layout.addWidget(QLabel("取整方式:"))
+        self.quantize_mode = QComboBox()
+        self.quantize_mode.addItems(curve_engine.QUANTIZE_MODES)
+        self.quantize_mode.setCurrentText("截断")
+        quantize_layout.addWidget(self.quantize_mode)
+        self.live_preview_check = QCheckBox("实时预览")
+        self.live_preview_check.setChecked(True)
+        quantize_layout.addWidget(self.live_preview_check)
+        param_layout.addLayout(quantize_layout)
+        
         # 添加参数说明提示
         help_text = """
 <b>曲线类型说明：</b><br>
@@ -190,9 +447,11 @@ class StepperCurveGenerator(QMainWindow):
 - <b>余弦</b>：基于余弦函数的平滑过渡<br>
 - <b>抛物线</b>：二次曲线，加减速度逐渐变化<br>
 - <b>自定义幂函数</b>：自定义幂指数的变化曲线<br>
+- <b>梯形/S型(加加速度限制)</b>：按最大加速度和加加速度计算每一步的真实脉冲间隔<br>
 <br>
 <b>生效范围</b>：可以设置曲线只在部分步数中生效<br>
-<b>起始/末尾段点数</b>：设置起始和末尾部分的平滑过渡点数
+<b>起始/末尾段点数</b>：设置起始和末尾部分的平滑过渡点数<br>
+<b>取整方式</b>：误差扩散把舍入误差顺延到后面的点，总运动时间与设计曲线一致
 """
         help_label = QLabel(help_text)
         help_label.setStyleSheet("background-color: #f0f0f0; padding: 5px; border-radius: 3px;")
@@ -201,17 +460,232 @@ class StepperCurveGenerator(QMainWindow):
         param_group.setLayout(param_layout)
         layout.addWidget(param_group)
         
+        # 导出设置
+        export_group = QGroupBox("导出设置")
+        export_layout = QVBoxLayout()
+        
+        name_layout = QHBoxLayout()
+        name_layout.addWidget(QLabel("数组名:"))
+        self.export_name = QLineEdit("GeneratedCurve")
+        name_layout.addWidget(self.export_name)
+        name_layout.addWidget(QLabel("每行个数:"))
+        self.export_per_line = QSpinBox()
+        self.export_per_line.setRange(1, 64)
+        self.export_per_line.setValue(10)
+        name_layout.addWidget(self.export_per_line)
+        export_layout.addLayout(name_layout)
+        
+        type_layout = QHBoxLayout()
+        type_layout.addWidget(QLabel("元素类型:"))
+        self.export_ctype = QComboBox()
+        self.export_ctype.addItems(["int", "自动(最小类型)", "uint8_t", "uint16_t", "uint32_t"])
+        type_layout.addWidget(self.export_ctype)
+        self.export_const = QCheckBox("const")
+        type_layout.addWidget(self.export_const)
+        type_layout.addWidget(QLabel("属性:"))
+        self.export_attributes = QComboBox()
+        self.export_attributes.setEditable(True)
+        self.export_attributes.addItems(["", "PROGMEM", '__attribute__((section(".rodata")))'])
+        type_layout.addWidget(self.export_attributes)
+        export_layout.addLayout(type_layout)
+        
+        export_group.setLayout(export_layout)
+        layout.addWidget(export_group)
+        
+        # 曲线工程：保存多条曲线及其生成参数和编辑历史
+        project_group = QGroupBox("曲线工程")
+        project_layout = QHBoxLayout()
+        self.project_list = QComboBox()
+        self.project_list.setMinimumWidth(150)
+        self.project_list.activated[str].connect(self.load_project_profile)
+        project_layout.addWidget(self.project_list, stretch=1)
+        self.store_profile_btn = QPushButton("存入工程")
+        self.store_profile_btn.clicked.connect(self.store_project_profile)
+        project_layout.addWidget(self.store_profile_btn)
+        self.open_project_btn = QPushButton("打开工程")
+        self.open_project_btn.clicked.connect(self.open_project)
+        project_layout.addWidget(self.open_project_btn)
+        self.save_project_btn = QPushButton("保存工程")
+        self.save_project_btn.clicked.connect(self.save_project)
+        project_layout.addWidget(self.save_project_btn)
+        project_group.setLayout(project_layout)
+        layout.addWidget(project_group)
+        
+        # 区域编辑：对一段连续的点一次性做变形
+        region_group = QGroupBox("区域编辑")
+        region_layout = QVBoxLayout()
+        
+        region_range_layout = QHBoxLayout()
+        region_range_layout.addWidget(QLabel("区域:"))
+        self.region_start = QSpinBox()
+        self.region_start.setRange(0, 0)
+        region_range_layout.addWidget(self.region_start)
+        region_range_layout.addWidget(QLabel("至"))
+        self.region_end = QSpinBox()
+        self.region_end.setRange(0, 0)
+        region_range_layout.addWidget(self.region_end)
+        self.region_view_btn = QPushButton("取当前视图")
+        self.region_view_btn.clicked.connect(self.use_view_as_region)
+        region_range_layout.addWidget(self.region_view_btn)
+        region_layout.addLayout(region_range_layout)
+        
+        operation_layout = QHBoxLayout()
+        operation_layout.addWidget(QLabel("操作:"))
+        self.region_operation = QComboBox()
+        self.region_operation.addItems(region_edit.OPERATIONS)
+        operation_layout.addWidget(self.region_operation)
+        operation_layout.addWidget(QLabel("数值:"))
+        self.region_amount = QDoubleSpinBox()
+        self.region_amount.setRange(-1000, 1000)
+        self.region_amount.setValue(10)
+        operation_layout.addWidget(self.region_amount)
+        self.region_curve_type = QComboBox()
+        self.region_curve_type.addItems(curve_engine.CURVE_TYPES + motion_profile.PROFILE_TYPES)
+        self.region_curve_type.setEnabled(False)
+        operation_layout.addWidget(self.region_curve_type)
+        region_layout.addLayout(operation_layout)
+        
+        brush_layout = QHBoxLayout()
+        self.region_apply_btn = QPushButton("应用到区域")
+        self.region_apply_btn.clicked.connect(self.apply_region_operation)
+        brush_layout.addWidget(self.region_apply_btn)
+        self.brush_check = QCheckBox("鼠标笔刷")
+        self.brush_check.setToolTip("勾选后在曲线上拖动，按下位置附近的点按高斯衰减一起移动")
+        brush_layout.addWidget(self.brush_check)
+        brush_layout.addWidget(QLabel("笔刷半径:"))
+        self.brush_radius = QSpinBox()
+        self.brush_radius.setRange(1, 100000)
+        self.brush_radius.setValue(10)
+        brush_layout.addWidget(self.brush_radius)
+        region_layout.addLayout(brush_layout)
+        
+        region_group.setLayout(region_layout)
+        layout.addWidget(region_group)
+        self.region_operation.currentTextChanged.connect(self.update_region_controls)
+        
+        # 约束检查与修正
+        constraint_group = QGroupBox("约束与平滑")
+        constraint_layout = QVBoxLayout()
+        
+        limit_layout = QHBoxLayout()
+        limit_layout.addWidget(QLabel("加速度上限:"))
+        self.limit_accel = QDoubleSpinBox()
+        self.limit_accel.setDecimals(0)
+        self.limit_accel.setRange(1, 1e12)
+        self.limit_accel.setValue(constraints.DEFAULT_MAX_ACCEL)
+        self.limit_accel.setSingleStep(1e7)
+        self.limit_accel.setSuffix(" °/s²")
+        limit_layout.addWidget(self.limit_accel)
+        self.monotonic_check = QCheckBox("加/减速段单调")
+        self.monotonic_check.setChecked(True)
+        limit_layout.addWidget(self.monotonic_check)
+        constraint_layout.addLayout(limit_layout)
+        
+        smooth_layout = QHBoxLayout()
+        self.smooth_check = QCheckBox("修正前平滑")
+        smooth_layout.addWidget(self.smooth_check)
+        smooth_layout.addWidget(QLabel("窗口:"))
+        self.smooth_window = QSpinBox()
+        self.smooth_window.setRange(3, 101)
+        self.smooth_window.setSingleStep(2)
+        self.smooth_window.setValue(7)
+        smooth_layout.addWidget(self.smooth_window)
+        self.violation_check = QCheckBox("标出违规点")
+        smooth_layout.addWidget(self.violation_check)
+        self.constraint_btn = QPushButton("修正曲线")
+        self.constraint_btn.clicked.connect(self.apply_constraints)
+        smooth_layout.addWidget(self.constraint_btn)
+        constraint_layout.addLayout(smooth_layout)
+        
+        self.constraint_status = QLabel("")
+        constraint_layout.addWidget(self.constraint_status)
+        
+        constraint_group.setLayout(constraint_layout)
+        layout.addWidget(constraint_group)
+        for widget in (self.violation_check, self.monotonic_check):
+            widget.toggled.connect(self.on_constraint_settings_changed)
+        self.limit_accel.valueChanged.connect(self.on_constraint_settings_changed)
+        
+        # 运动仿真：定时器和电机参数
+        sim_group = QGroupBox("运动仿真")
+        sim_layout = QVBoxLayout()
+        
+        timer_layout = QHBoxLayout()
+        timer_layout.addWidget(QLabel("定时器时钟:"))
+        self.timer_clock = QDoubleSpinBox()
+        self.timer_clock.setDecimals(3)
+        self.timer_clock.setRange(0.001, 1000)
+        self.timer_clock.setValue(motion_sim.DEFAULT_TIMER_CLOCK / 1e6)
+        self.timer_clock.setSuffix(" MHz")
+        timer_layout.addWidget(self.timer_clock)
+        timer_layout.addWidget(QLabel("预分频:"))
+        self.prescaler = QSpinBox()
+        self.prescaler.setRange(1, 65536)
+        self.prescaler.setValue(motion_sim.DEFAULT_PRESCALER)
+        timer_layout.addWidget(self.prescaler)
+        sim_layout.addLayout(timer_layout)
+        
+        motor_layout = QHBoxLayout()
+        motor_layout.addWidget(QLabel("步距角:"))
+        self.step_angle = QDoubleSpinBox()
+        self.step_angle.setDecimals(3)
+        self.step_angle.setRange(0.001, 90)
+        self.step_angle.setValue(curve_engine.STEP_ANGLE)
+        self.step_angle.setSuffix(" °")
+        motor_layout.addWidget(self.step_angle)
+        motor_layout.addWidget(QLabel("细分:"))
+        self.microsteps = QComboBox()
+        self.microsteps.addItems([str(m) for m in motion_sim.MICROSTEP_OPTIONS])
+        motor_layout.addWidget(self.microsteps)
+        self.simulation_btn = QPushButton("仿真曲线")
+        self.simulation_btn.clicked.connect(self.show_simulation)
+        motor_layout.addWidget(self.simulation_btn)
+        sim_layout.addLayout(motor_layout)
+        
+        sim_group.setLayout(sim_layout)
+        layout.addWidget(sim_group)
+        for widget in (self.timer_clock, self.step_angle):
+            widget.valueChanged.connect(self.on_simulation_settings_changed)
+        self.prescaler.valueChanged.connect(self.on_simulation_settings_changed)
+        self.microsteps.currentTextChanged.connect(self.on_simulation_settings_changed)
+        
+        # 性能监测：记录各操作的耗时和输入到重绘的延迟，现场卡顿时导出分析
+        perf_group = QGroupBox("性能监测")
+        perf_layout = QHBoxLayout()
+        self.perf_check = QCheckBox("记录")
+        self.perf_check.toggled.connect(self.on_perf_toggled)
+        perf_layout.addWidget(self.perf_check)
+        self.perf_overlay_check = QCheckBox("显示帧率/延迟")
+        self.perf_overlay_check.setEnabled(False)
+        self.perf_overlay_check.toggled.connect(self.on_perf_overlay_toggled)
+        perf_layout.addWidget(self.perf_overlay_check)
+        self.perf_dump_btn = QPushButton("导出性能数据")
+        self.perf_dump_btn.clicked.connect(self.dump_perf_stats)
+        perf_layout.addWidget(self.perf_dump_btn)
+        self.perf_clear_btn = QPushButton("清空")
+        self.perf_clear_btn.clicked.connect(self.clear_perf_stats)
+        perf_layout.addWidget(self.perf_clear_btn)
+        perf_group.setLayout(perf_layout)
+        layout.addWidget(perf_group)
+        
         # 按钮区域
         button_layout = QHBoxLayout()
         self.import_btn = QPushButton("导入数组")
+        self.import_file_btn = QPushButton("从文件导入")
         self.generate_btn = QPushButton("生成曲线")
         self.export_btn = QPushButton("导出C数组")
+        self.export_header_btn = QPushButton("批量导出头文件")
         
         button_layout.addWidget(self.import_btn)
+        button_layout.addWidget(self.import_file_btn)
         button_layout.addWidget(self.generate_btn)
         button_layout.addWidget(self.export_btn)
         layout.addLayout(button_layout)
         
+        bulk_layout = QHBoxLayout()
+        bulk_layout.addWidget(self.export_header_btn)
+        layout.addLayout(bulk_layout)
+        
         # 拖拽提示
         drag_tip = QLabel("提示: 点击曲线上的蓝色点并上下拖动修改值")
         drag_tip.setStyleSheet("color: blue; font-weight: bold;")
@@ -228,12 +702,22 @@ class StepperCurveGenerator(QMainWindow):
         
         # 连接信号
         self.import_btn.clicked.connect(self.import_array)
+        self.import_file_btn.clicked.connect(self.import_file)
         self.generate_btn.clicked.connect(self.generate_curve)
         self.export_btn.clicked.connect(self.export_array)
+        self.export_header_btn.clicked.connect(self.export_header)
         
         # 设置部分控件的显示/隐藏逻辑
         self.curve_type.currentTextChanged.connect(self.update_control_visibility)
         
+        # 生成参数变化时刷新实时预览
+        for widget in (self.points_spin, self.start_value, self.end_value, self.range_start, self.range_end,
+                       self.start_size, self.end_size, self.power_value, self.max_accel, self.max_jerk):
+            widget.valueChanged.connect(self.schedule_preview)
+        for widget in (self.curve_type, self.quantize_mode):
+            widget.currentTextChanged.connect(self.schedule_preview)
+        self.live_preview_check.toggled.connect(self.on_live_preview_toggled)
+        
         panel.setLayout(layout)
         return panel
         
@@ -254,6 +738,11 @@ class StepperCurveGenerator(QMainWindow):
         keyboard_tip.setStyleSheet("color: blue; font-weight: bold;")
         layout.addWidget(keyboard_tip)
         
+        # 视图操作提示
+        view_tip = QLabel("◆ 视图操作: 滚轮缩放，右键拖动平移，点击底部缩略图定位，Home键恢复完整视图")
+        view_tip.setStyleSheet("color: blue; font-weight: bold;")
+        layout.addWidget(view_tip)
+        
         # 点信息显示区域
         self.point_info_area = QLabel("选中点信息显示区域")
         self.point_info_area.setStyleSheet("background-color: lightyellow; padding: 5px; border: 1px solid gray;")
@@ -312,193 +801,642 @@ class StepperCurveGenerator(QMainWindow):
         adjust_layout.addWidget(self.fine_increase_btn)
         adjust_layout.addWidget(self.increase_btn)
         
+        # 撤销/重做按钮
+        self.undo_btn = QPushButton("撤销")
+        self.undo_btn.clicked.connect(self.undo_edit)
+        self.undo_btn.setEnabled(False)
+        self.redo_btn = QPushButton("重做")
+        self.redo_btn.clicked.connect(self.redo_edit)
+        self.redo_btn.setEnabled(False)
+        adjust_layout.addWidget(self.undo_btn)
+        adjust_layout.addWidget(self.redo_btn)
+        
         layout.addLayout(adjust_layout)
         
         panel.setLayout(layout)
         return panel
         
     def parse_c_array(self, text):
-        """解析C数组文本为Python列表"""
-        nums = re.findall(r'\{([^\}]*)\}', text)
-        if not nums:
-            return []
-        try:
-            arr = [int(x.strip()) for x in nums[0].split(',') if x.strip().isdigit()]
-            return arr
-        except ValueError:
-            return []
+        """解析C数组文本为NumPy数组，文本中有多个数组时让用户选择，取消或没有数组时返回None"""
+        arrays = [a for a in c_array.parse_c_arrays(text) if len(a.values) > 0]
+        if not arrays:
+            return None
+        if len(arrays) == 1:
+            return arrays[0].values
+        
+        names = [f"{a.name or '(匿名数组)'} [{len(a.values)}]" for a in arrays]
+        name, ok = QInputDialog.getItem(self, "选择数组", "文本中包含多个数组，请选择要导入的数组:", names, 0, False)
+        if not ok:
+            return None
+        return arrays[names.index(name)].values
             
+    def set_current_array(self, arr, derived=None):
+        """替换当前数组，并一次性向量化计算全部派生数据
+
+        derived为缓存中取出的(金字塔, 角速度, 旋转一圈耗时)副本时直接使用，数组取金字塔的values。
+        """
+        if derived is None:
+            self.current_array = np.array(arr, dtype=np.int64)
+            self.angular_velocity = curve_engine.angular_velocity(self.current_array, *self.motion_units)
+            self.full_circle_times = curve_engine.full_circle_time(self.current_array, *self.motion_units)
+            self.pulse_lod = plot_lod.MinMaxPyramid(self.current_array)
+        else:
+            self.pulse_lod, self.angular_velocity, self.full_circle_times = derived
+            self.current_array = self.pulse_lod.values
+        self.total_pulse = int(self.current_array.sum())
+        self.pulse_sums = curve_engine.PrefixSum(self.current_array)
+        # 整个数组被替换后，原来的编辑记录不再适用
+        self.history.clear()
+        self.update_history_buttons()
+        self.x_pos_spin.setMaximum(max(0, len(self.current_array) - 1))
+        self.region_start.setMaximum(max(0, len(self.current_array) - 1))
+        self.region_end.setMaximum(max(0, len(self.current_array) - 1))
+    
+    def set_point_value(self, idx, value, record=True):
+        """修改单个点的值，派生数据只更新该点（O(1)）
+
+        record为True时把修改记入撤销历史，撤销/重做写回数值时为False。
+        """
+        old_value = int(self.current_array[idx])
+        value = int(value)
+        if record and value != old_value:
+            self.history.record(idx, old_value, value)
+            self.update_history_buttons()
+        self.current_array[idx] = value
+        self.angular_velocity[idx] = curve_engine.angular_velocity(value, *self.motion_units)
+        self.full_circle_times[idx] = curve_engine.full_circle_time(value, *self.motion_units)
+        self.total_pulse += value - old_value
+        self.pulse_lod.update(idx)
+        if value != old_value:
+            self.pulse_sums.add(idx, value - old_value)
+    
+    def set_region_values(self, lo, values, record=True):
+        """把values写入current_array[lo:lo+len(values)]，派生数据只更新该区间，返回修改的点数"""
+        values = np.asarray(values, dtype=np.int64)
+        hi = lo + len(values)
+        old = self.current_array[lo:hi].copy()
+        changed = np.nonzero(old != values)[0]
+        if len(changed) == 0:
+            return 0
+        if record:
+            self.history.record_many(changed + lo, old[changed], values[changed])
+            self.update_history_buttons()
+        
+        self.current_array[lo:hi] = values
+        self.angular_velocity[lo:hi] = curve_engine.angular_velocity(values, *self.motion_units)
+        self.full_circle_times[lo:hi] = curve_engine.full_circle_time(values, *self.motion_units)
+        self.total_pulse += int(values.sum() - old.sum())
+        self.pulse_lod.update_range(lo, hi)
+        # 修改的点很多时整体重建前缀和比逐点更新快
+        if len(changed) * 32 > len(self.current_array):
+            self.pulse_sums = curve_engine.PrefixSum(self.current_array)
+        else:
+            for i, delta in zip((changed + lo).tolist(), (values[changed] - old[changed]).tolist()):
+                self.pulse_sums.add(i, delta)
+        return len(changed)
+    
+    def update_history_buttons(self):
+        """根据撤销/重做栈更新按钮状态"""
+        self.undo_btn.setEnabled(self.history.can_undo())
+        self.redo_btn.setEnabled(self.history.can_redo())
+    
+    def undo_edit(self):
+        """撤销最近一次修改"""
+        self.apply_history(self.history.undo(), "撤销")
+    
+    def redo_edit(self):
+        """重做最近撤销的修改"""
+        self.apply_history(self.history.redo(), "重做")
+    
+    def apply_history(self, change, action):
+        """把撤销/重做得到的(下标数组, 数值数组)写回当前数组，只处理被修改的点"""
+        self.update_history_buttons()
+        if change is None:
+            self.status_label.setText(f"没有可{action}的修改")
+            return
+        
+        # 结束进行中的拖动，避免撤销后继续拖动覆盖刚恢复的值
+        self.dragging = False
+        self.pending_drag = None
+        self.last_drag_target = None
+        
+        indices, values = change
+        for idx, value in zip(indices.tolist(), values.tolist()):
+            self.set_point_value(idx, value, record=False)
+        
+        self.status_label.setText(f"{action}: 恢复了 {len(indices)} 个点")
+        if len(indices) == 1:
+            self.ensure_visible(int(indices[0]))
+        if self.selected_point is not None:
+            self.update_point_info(self.selected_point, self.current_array[self.selected_point])
+            self.y_value_spin.setValue(int(self.current_array[self.selected_point]))
+        self.plot_array(self.current_array)
+    
+    def get_elapsed_time(self, idx):
+        """走到第idx步的累计耗时(us)，O(log n)"""
+        return self.pulse_sums.prefix(idx) * self.motion_units[1]
+    
+    def simulation_params(self):
+        """界面中设置的定时器和电机参数，作为motion_sim函数的关键字参数"""
+        return {
+            "timer_clock": self.timer_clock.value() * 1e6,
+            "prescaler": self.prescaler.value(),
+            "step_angle": self.step_angle.value(),
+            "microsteps": int(self.microsteps.currentText()),
+        }
+    
+    def pulse_unit_us(self):
+        """一个脉冲计数对应的时间(us)"""
+        return motion_sim.count_period(self.timer_clock.value() * 1e6, self.prescaler.value()) * 1e6
+    
+    def read_motion_units(self):
+        """界面中的(每个脉冲的角度, 一个计数的微秒数)，全部速度和加速度都按它换算"""
+        params = self.simulation_params()
+        return motion_sim.pulse_angle(params["step_angle"], params["microsteps"]), self.pulse_unit_us()
+    
+    def on_simulation_settings_changed(self):
+        """定时器或电机参数变化后重新换算角速度，刷新图形、耗时显示、选中点信息和仿真窗口"""
+        self.motion_units = self.read_motion_units()
+        self.angular_velocity = curve_engine.angular_velocity(self.current_array, *self.motion_units)
+        self.full_circle_times = curve_engine.full_circle_time(self.current_array, *self.motion_units)
+        if self.plot_signature is not None:
+            self.plot_array(self.current_array)
+        # 运动学曲线的形状取决于时间基准，需要重新生成
+        if self.curve_type.currentText() in motion_profile.PROFILE_TYPES:
+            self.schedule_preview()
+        if self.plot_signature is not None:
+            self.update_time_label(self.total_pulse, self.plot_signature[1])
+        if self.selected_point is not None and 0 <= self.selected_point < len(self.current_array):
+            self.update_point_info(self.selected_point, self.current_array[self.selected_point])
+        self.schedule_simulation()
+    
+    def show_simulation(self):
+        """打开运动仿真窗口"""
+        if self.simulation_window is None:
+            self.simulation_window = SimulationWindow(self)
+        self.simulation_window.show()
+        self.simulation_window.raise_()
+        self.refresh_simulation()
+    
+    def schedule_simulation(self):
+        """仿真窗口打开时，合并连续的修改后再刷新"""
+        if self.simulation_window is not None and self.simulation_window.isVisible():
+            self.simulation_timer.start()
+    
+    def refresh_simulation(self):
+        """按当前数组和参数重新仿真并更新仿真窗口"""
+        if self.simulation_window is None or not self.simulation_window.isVisible():
+            return
+        try:
+            trace = motion_sim.simulate(self.current_array, **self.simulation_params())
+        except ValueError as e:
+            self.simulation_window.show_error(str(e))
+            return
+        self.simulation_window.set_trace(trace)
+    
     def import_array(self):
         """导入数组并显示曲线"""
-        text = self.array_input.toPlainText()
-        self.current_array = self.parse_c_array(text)
-        if not self.current_array:
+        self.load_array_text(self.array_input.toPlainText())
+    
+    def import_file(self):
+        """从C源文件/头文件导入数组（文件内容不放入文本框）"""
+        path, _ = QFileDialog.getOpenFileName(self, "导入C数组文件", "", "C源文件 (*.c *.h);;所有文件 (*)")
+        if not path:
+            return
+        try:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                text = f.read()
+        except OSError as e:
+            QMessageBox.warning(self, "警告", f"无法读取文件: {e}")
+            return
+        self.load_array_text(text)
+    
+    def load_array_text(self, text):
+        """解析C数组文本并显示曲线"""
+        try:
+            arr = self.parse_c_array(text)
+        except ValueError as e:
+            QMessageBox.warning(self, "警告", f"无法解析数组: {e}")
+            return
+        if arr is None:
             QMessageBox.warning(self, "警告", "无法解析数组，请检查格式！")
             return
+        self.set_current_array(arr)
+        self.current_params = None
             
         # 清除选择状态，避免重影
         self.reset_selection_state()
         self.plot_array(self.current_array)
         
+    @perf_monitor.timed("generate")
     def generate_curve(self):
         """根据参数生成曲线"""
-        curve_type = self.curve_type.currentText()
-        n_points = self.points_spin.value()
-        start = self.start_value.value()
-        end = self.end_value.value()
-        
-        # 获取生效范围
-        range_start_percent = self.range_start.value() / 100
-        range_end_percent = self.range_end.value() / 100
-        
-        # 获取起始段和末尾段点数
-        start_size = self.start_size.value()
-        end_size = self.end_size.value()
-        
-        # 创建全长数组
-        full_array = np.zeros(n_points, dtype=int)
-        
-        # 计算实际生效范围的点数
-        start_idx = int(n_points * range_start_percent)
-        end_idx = int(n_points * range_end_percent)
-        effect_points = end_idx - start_idx
-        
-        # 确保起始段和末尾段点数不超过生效范围
-        start_size = min(start_size, effect_points // 3)
-        end_size = min(end_size, effect_points // 3)
-        
-        # 根据曲线类型生成中间部分曲线
-        mid_points = effect_points - start_size - end_size
-        
-        # 不同曲线类型的生成方法
-        if curve_type == "线性":
-            # 线性变化
-            effect_curve = np.linspace(start, end, effect_points)
-        elif curve_type == "指数":
-            # 指数变化 - 防止log(0)错误
-            start_val = max(1, start)
-            end_val = max(1, end)
-            effect_curve = np.exp(np.linspace(np.log(start_val), np.log(end_val), effect_points))
-        elif curve_type == "S型":
-            # S型曲线 (三次多项式)
-            t = np.linspace(0, 1, effect_points)
-            effect_curve = start + (end - start) * (3*t**2 - 2*t**3)
-        elif curve_type == "余弦":
-            # 余弦变化
-            t = np.linspace(0, 1, effect_points)
-            effect_curve = start + (end - start) * (1 - np.cos(t * np.pi)) / 2
-        elif curve_type == "抛物线":
-            # 抛物线变化
-            t = np.linspace(0, 1, effect_points)
-            effect_curve = start + (end - start) * t**2
-        elif curve_type == "自定义幂函数":
-            # 幂函数变化
-            power = self.power_value.value()
-            t = np.linspace(0, 1, effect_points)
-            if start >= end:
-                effect_curve = start - (start - end) * t**power
-            else:
-                effect_curve = start + (end - start) * t**power
-        else:
-            # 默认线性
-            effect_curve = np.linspace(start, end, effect_points)
-        
-        # 如果需要处理起始段和末尾段的特殊平滑
-        if start_size > 0 or end_size > 0:
-            # 提取主体曲线的起始值和结束值
-            curve_start_val = effect_curve[0]
-            curve_end_val = effect_curve[-1]
-            
-            # 重新生成曲线，考虑起始段和末尾段
-            if start_size > 0:
-                # 起始段使用S型过渡
-                start_t = np.linspace(0, 1, start_size)
-                start_curve = start + (curve_start_val - start) * (3*start_t**2 - 2*start_t**3)
-                effect_curve[:start_size] = start_curve
-                
-            if end_size > 0:
-                # 末尾段使用S型过渡
-                end_t = np.linspace(0, 1, end_size)
-                end_curve = curve_end_val + (end - curve_end_val) * (3*end_t**2 - 2*end_t**3)
-                effect_curve[-end_size:] = end_curve
-        
-        # 曲线插入到整体数组中
-        full_array[start_idx:end_idx] = effect_curve.astype(int)
-        
-        # 处理未覆盖的部分
-        if start_idx > 0:
-            # 起始段之前保持起始值
-            full_array[:start_idx] = start
-        
-        if end_idx < n_points:
-            # 末尾段之后保持终止值
-            full_array[end_idx:] = end
-        
-        self.current_array = full_array.tolist()
+        # 手动生成优先，还没返回的预览结果作废
+        self.cancel_preview()
+        params = self.generation_params()
+        key = self.generation_key(params)
+        
+        # 参数与之前生成过的某条曲线相同时直接取缓存
+        derived = self.generation_cache.get(key)
+        if derived is None:
+            try:
+                derived = compute_curve(params)
+            except ValueError as e:
+                QMessageBox.warning(self, "警告", str(e))
+                return
+            self.generation_cache.put(key, derived, len(derived[0].values))
+        self.show_generated(derived)
+    
+    def show_generated(self, derived):
+        """显示生成结果；缓存中保存的是未经编辑的原件，这里使用副本"""
+        pyramid, velocity, circle_times = derived
+        self.set_current_array(None, (pyramid.copy(), velocity.copy(), circle_times.copy()))
+        self.current_params = self.generation_params()
             
         # 清除选择状态，避免重影
         self.reset_selection_state()
         self.plot_array(self.current_array)
     
+    def generation_params(self):
+        """界面中的全部生成参数，作为compute_curve的输入"""
+        return {
+            "curve_type": self.curve_type.currentText(),
+            "n_points": self.points_spin.value(),
+            "start": self.start_value.value(),
+            "end": self.end_value.value(),
+            "effect_range": (self.range_start.value() / 100, self.range_end.value() / 100),
+            "start_size": self.start_size.value(),
+            "end_size": self.end_size.value(),
+            "power": self.power_value.value(),
+            "quantization": self.quantize_mode.currentText(),
+            "max_accel": self.max_accel.value(),
+            "max_jerk": self.max_jerk.value(),
+            "pulse_angle": self.motion_units[0],
+            "unit_us": self.motion_units[1],
+        }
+    
+    def generation_key(self, params):
+        """结果缓存的键，只包含当前曲线类型实际使用的参数"""
+        curve_type = params["curve_type"]
+        # 派生的角速度数组取决于时间基准，所有类型的键都包含它
+        key = (curve_type, params["n_points"], params["start"], params["end"], params["quantization"],
+               params["pulse_angle"], params["unit_us"])
+        if curve_type in motion_profile.PROFILE_TYPES:
+            jerk = params["max_jerk"] if curve_type == motion_profile.JERK_LIMITED else None
+            return key + (params["max_accel"], jerk)
+        power = params["power"] if curve_type == "自定义幂函数" else None
+        return key + (params["effect_range"], params["start_size"], params["end_size"], power)
+    
+    def apply_generation_params(self, params):
+        """把保存的生成参数写回界面控件，不触发实时预览"""
+        self.curve_type.setCurrentText(params["curve_type"])
+        self.points_spin.setValue(params["n_points"])
+        self.start_value.setValue(params["start"])
+        self.end_value.setValue(params["end"])
+        self.range_start.setValue(round(params["effect_range"][0] * 100))
+        self.range_end.setValue(round(params["effect_range"][1] * 100))
+        self.start_size.setValue(params["start_size"])
+        self.end_size.setValue(params["end_size"])
+        self.power_value.setValue(params["power"])
+        self.quantize_mode.setCurrentText(params["quantization"])
+        self.max_accel.setValue(params["max_accel"])
+        self.max_jerk.setValue(params["max_jerk"])
+        self.cancel_preview()
+    
+    def refresh_project_list(self, current=None):
+        """按工程中的曲线更新下拉框"""
+        self.project_list.clear()
+        self.project_list.addItems(self.project.names())
+        if current is not None:
+            self.project_list.setCurrentText(current)
+    
+    def store_project_profile(self):
+        """把当前数组连同生成参数和编辑历史按导出名称存入工程，同名时覆盖"""
+        if len(self.current_array) == 0:
+            QMessageBox.warning(self, "警告", "没有可保存的数组！")
+            return
+        history = edit_history.EditHistory()
+        history.load_arrays(self.history.to_arrays())
+        name = self.get_export_name()
+        self.project.put(name, self.current_array.copy(), self.current_params, history)
+        self.refresh_project_list(name)
+        self.status_label.setText(f"已存入工程: {name}")
+    
+    def load_project_profile(self, name):
+        """显示工程中的一条曲线，第一次访问时才从文件读取数组"""
+        profile = self.project.get(name)
+        if profile is None:
+            return
+        try:
+            arr = profile.array
+            history_arrays = profile.history.to_arrays()
+        except (OSError, ValueError, KeyError) as e:
+            QMessageBox.warning(self, "警告", f"无法读取曲线 {name}: {e}")
+            return
+        if profile.params is not None:
+            self.apply_generation_params(profile.params)
+        self.cancel_preview()
+        self.set_current_array(arr)
+        self.current_params = profile.params
+        self.history.load_arrays(history_arrays)
+        self.update_history_buttons()
+        self.export_name.setText(name)
+        self.reset_selection_state()
+        self.plot_array(self.current_array)
+    
+    def open_project(self):
+        """打开工程文件，只读取曲线列表，曲线数据在选中时才读取"""
+        path, _ = QFileDialog.getOpenFileName(self, "打开工程", "", f"曲线工程 (*{project.PROJECT_SUFFIX})")
+        if not path:
+            return
+        try:
+            opened = project.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            QMessageBox.warning(self, "警告", f"无法打开工程: {e}")
+            return
+        self.project.close()
+        self.project = opened
+        self.refresh_project_list()
+        names = self.project.names()
+        if names:
+            self.load_project_profile(names[0])
+        self.status_label.setText(f"已打开工程 {os.path.basename(path)}，共{len(names)}条曲线")
+    
+    def save_project(self):
+        """保存工程文件"""
+        if not self.project.names():
+            QMessageBox.warning(self, "警告", "工程中还没有曲线，请先点击\"存入工程\"")
+            return
+        default = self.project.path or "profiles" + project.PROJECT_SUFFIX
+        path, _ = QFileDialog.getSaveFileName(self, "保存工程", default, f"曲线工程 (*{project.PROJECT_SUFFIX})")
+        if not path:
+            return
+        if not path.endswith(project.PROJECT_SUFFIX):
+            path += project.PROJECT_SUFFIX
+        try:
+            self.project.save(path)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "警告", f"无法保存工程: {e}")
+            return
+        self.status_label.setText(f"已保存工程 {os.path.basename(path)}，共{len(self.project.names())}条曲线")
+    
+    def schedule_preview(self):
+        """参数变化后重新计时，停止变化PREVIEW_DELAY_MS之后才生成预览"""
+        if self.live_preview_check.isChecked():
+            self.preview_timer.start()
+    
+    def on_live_preview_toggled(self, checked):
+        """打开时按当前参数预览一次；关闭时作废已计时和正在生成的预览"""
+        if checked:
+            self.schedule_preview()
+        else:
+            self.cancel_preview()
+            self.status_label.setText("实时预览已关闭")
+    
+    def start_preview(self):
+        """提交一次预览请求：命中缓存时直接显示，否则在线程池中生成"""
+        # 拖动或笔刷编辑进行中时不替换数组，等手势结束后再试
+        if self.dragging or self.brush_state is not None:
+            self.preview_timer.start()
+            return
+        # 替换数组会清空撤销历史，有手动修改时不自动覆盖，只在点击"生成曲线"时替换
+        if self.has_manual_edits():
+            self.status_label.setText(PREVIEW_PAUSED_TEXT)
+            return
+        params = self.generation_params()
+        key = self.generation_key(params)
+        self.preview_request += 1
+        # 排队中还没开始的旧任务直接移除，正在运行的任务结束后其结果会被丢弃
+        self.preview_pool.clear()
+        
+        derived = self.generation_cache.get(key)
+        if derived is not None:
+            self.show_generated(derived)
+            return
+        task = PreviewTask(self.preview_request, key, params, self.is_current_preview)
+        task.signals.finished.connect(self.on_preview_finished)
+        task.signals.failed.connect(self.on_preview_failed)
+        self.preview_task = task
+        self.preview_pool.start(task)
+        self.status_label.setText("正在生成预览...")
+    
+    def has_manual_edits(self):
+        """当前曲线是否有可撤销/重做的手动修改"""
+        return self.history.can_undo() or self.history.can_redo()
+    
+    def is_current_preview(self, request_id):
+        """请求是否仍是最新的一次（在工作线程中调用）"""
+        return request_id == self.preview_request
+    
+    @perf_monitor.timed("preview")
+    def on_preview_finished(self, request_id, key, derived):
+        """预览生成完成，只显示最新一次请求的结果"""
+        self.generation_cache.put(key, derived, len(derived[0].values))
+        if request_id != self.preview_request:
+            return
+        # 生成期间用户修改了曲线时同样不覆盖
+        if self.has_manual_edits() or self.dragging or self.brush_state is not None:
+            self.status_label.setText(PREVIEW_PAUSED_TEXT)
+            return
+        self.show_generated(derived)
+        self.status_label.setText("预览已更新")
+    
+    def on_preview_failed(self, request_id, message):
+        """预览参数无效时在状态栏提示，不弹出对话框打断输入"""
+        if request_id == self.preview_request:
+            self.status_label.setText(f"预览失败: {message}")
+    
+    def cancel_preview(self):
+        """作废尚未显示的预览"""
+        self.preview_timer.stop()
+        self.preview_request += 1
+        self.preview_pool.clear()
+    
+    def closeEvent(self, event):
+        """关闭窗口前等待正在运行的预览任务结束"""
+        self.cancel_preview()
+        self.preview_pool.waitForDone()
+        super().closeEvent(event)
+    
+    def on_perf_toggled(self, checked):
+        """开启/关闭性能记录；关闭时移除事件过滤器，不再有任何额外开销"""
+        self.perf.enabled = checked
+        self.perf.input_time = None
+        if checked:
+            self.canvas.installEventFilter(self)
+        else:
+            self.canvas.removeEventFilter(self)
+        self.perf_overlay_check.setEnabled(checked)
+        if not checked:
+            self.perf_overlay_check.setChecked(False)
+    
+    def on_perf_overlay_toggled(self, checked):
+        """在画布左上角显示帧率和延迟；叠加层是独立的控件，不参与matplotlib的重绘"""
+        self.perf_overlay.setVisible(checked)
+        if checked:
+            self.refresh_perf_overlay()
+            self.perf_overlay_timer.start()
+        else:
+            self.perf_overlay_timer.stop()
+    
+    def refresh_perf_overlay(self):
+        """叠加层显示帧率、延迟的中位数/p95，以及各操作最近一次的耗时"""
+        lines = [f"FPS {self.perf.fps():5.1f}"]
+        latency = self.perf.get("latency")
+        if latency is not None:
+            lines.append(f"延迟 {latency.percentile(50):6.1f} / p95 {latency.percentile(95):6.1f} ms")
+        for name, label in (("frame", "帧"), ("drag", "拖动"), ("plot", "绘制"), ("generate", "生成")):
+            stats = self.perf.get(name)
+            if stats is not None:
+                lines.append(f"{label} {stats.last:8.1f} ms")
+        self.perf_overlay.setText("\n".join(lines))
+        self.perf_overlay.adjustSize()
+        self.perf_overlay.raise_()
+    
+    def eventFilter(self, obj, event):
+        """性能记录开启时安装在画布上：每次重绘计入帧率，并结算之前输入事件的延迟
+
+        叠加层半透明，它自己刷新时画布也会重绘其下方的区域，这种重绘不计入。
+        """
+        if obj is self.canvas and event.type() == QEvent.Paint:
+            if not (self.perf_overlay.isVisible() and self.perf_overlay.geometry().contains(event.rect())):
+                self.perf.painted()
+        return super().eventFilter(obj, event)
+    
+    def dump_perf_stats(self):
+        """把性能统计连同当前曲线的规模导出为JSON文件"""
+        if not self.perf.stats:
+            QMessageBox.warning(self, "警告", "还没有性能数据，请先勾选\"记录\"并操作一段时间")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "导出性能数据", "perf_stats.json", "JSON文件 (*.json)")
+        if not path:
+            return
+        context = {"points": len(self.current_array), "curve_type": self.curve_type.currentText(),
+                   "canvas_size": [self.canvas.width(), self.canvas.height()]}
+        try:
+            self.perf.dump(path, context)
+        except OSError as e:
+            QMessageBox.warning(self, "警告", f"导出失败: {e}")
+            return
+        self.status_label.setText(f"性能数据已导出到 {path}")
+    
+    def clear_perf_stats(self):
+        self.perf.clear()
+        if self.perf_overlay.isVisible():
+            self.refresh_perf_overlay()
+    
     def on_mouse_move(self, event):
-        """鼠标移动事件处理"""
+        """鼠标移动事件处理
+
+        只记录最新的鼠标位置，界面和图形的更新合并到下一帧统一处理，
+        位置对应的值没有变化时不做任何更新。
+        """
+        # 右键平移视图：按鼠标移动的像素换算横坐标偏移
+        if self.pan_start is not None:
+            x_px, (x0, x1) = self.pan_start
+            shift = (event.x - x_px) * (x1 - x0) / self.ax.bbox.width
+            self.pending_view = (x0 - shift, x1 - shift)
+            self.perf.mark_input()
+            self.schedule_frame_update()
+            return
+        
+        # 在缩略图中拖动，视图中心跟随鼠标
+        if self.overview_dragging:
+            if event.inaxes is self.overview_ax:
+                self.center_view(event.xdata)
+            return
+        
         # 首先更新鼠标位置信息
         if event.inaxes == self.ax and len(self.current_array) > 0:
             # 当鼠标在图表区域内时，显示当前位置的脉冲时间
             x_pos = int(round(event.xdata))
             
-            # 将Y轴坐标限制在0-100范围内
-            y_data = event.ydata
             # 将Y坐标除以3，使得鼠标可以在更大范围内移动
-            y_data = y_data / 3
-            
-            y_pos = int(round(y_data))
+            y_pos = int(round(event.ydata / 3))
             
             # 确保在有效范围内
-            if 0 <= x_pos < len(self.current_array):
-                # 更新脉冲时间信息
-                pulse_time = y_pos  # 脉冲时间直接对应Y坐标值
-                self.pulse_info_label.setText(f"当前位置: X={x_pos}, Y={y_pos} (脉冲时间: {pulse_time}μs)")
-                
-                # 如果有对应角速度，也显示
-                if pulse_time > 0:
-                    step_angle = 1.8  # 度
-                    angular_velocity = step_angle / (pulse_time/1000)  # 度/秒
-                    self.pulse_info_label.setText(f"当前位置: X={x_pos}, Y={y_pos} (脉冲时间: {pulse_time}μs, 角速度: {angular_velocity:.2f}°/s)")
+            if 0 <= x_pos < len(self.current_array) and (x_pos, y_pos) != self.last_hover:
+                self.last_hover = (x_pos, y_pos)
+                self.pending_hover = (x_pos, y_pos)
+                self.schedule_frame_update()
+        
+        # 笔刷拖动同样按帧合并
+        if self.brush_state is not None:
+            if event.ydata is not None:
+                self.pending_brush = event.ydata / 3
+                self.perf.mark_input()
+                self.schedule_frame_update()
+            return
         
         # 如果没有选中点或者没有在拖动，则不继续处理拖动逻辑
         if not self.dragging or self.selected_point is None:
             return
-            
-        # 添加调试信息
-        debug_info = f"拖动中: 坐标({event.x}, {event.y})"
         
         # 检查鼠标位置是否有有效坐标
         if event.xdata is None or event.ydata is None:
-            self.status_label.setText(f"{debug_info} - 拖动位置缺少坐标数据")
+            self.status_label.setText(f"拖动中: 坐标({event.x}, {event.y}) - 拖动位置缺少坐标数据")
             return
-            
-        # 添加数据坐标调试信息
-        debug_info += f" 数据({event.xdata:.1f}, {event.ydata:.1f})"
-        self.status_label.setText(debug_info)
         
         # 获取新的y值 - 将点直接移动到鼠标Y位置
-        # 首先确保Y坐标在图表的有效范围内（0-100）
-        y_data = event.ydata
         # 将Y坐标除以3，使得鼠标可以在更大范围内移动
-        y_data = y_data / 3
-            
-        # 四舍五入到整数值
-        new_y = int(round(y_data))
+        y_data = event.ydata / 3
         
-        # 再限制在应用程序要求的6-98范围内
-        new_y = max(6, min(98, new_y))
+        # 四舍五入到整数值，再限制在应用程序要求的6-98范围内
+        new_y = max(6, min(98, int(round(y_data))))
         
         idx = self.selected_point
         
+        # 值没有变化时直接丢弃该事件
+        if (idx, new_y) == self.last_drag_target:
+            return
+        self.last_drag_target = (idx, new_y)
+        self.pending_drag = (idx, new_y, y_data)
+        self.perf.mark_input()
+        self.schedule_frame_update()
+    
+    def schedule_frame_update(self):
+        """在下一帧统一刷新界面，同一帧内的多次鼠标移动只处理最后一次"""
+        if not self.frame_timer.isActive():
+            self.frame_timer.start()
+    
+    @perf_monitor.timed("frame")
+    def flush_pending_updates(self):
+        """应用合并后的鼠标移动结果"""
+        self.frame_timer.stop()
+        
+        if self.pending_hover is not None:
+            x_pos, y_pos = self.pending_hover
+            self.pending_hover = None
+            
+            # Y坐标对应脉冲时长（定时器计数）
+            pulse_time = y_pos * self.motion_units[1]  # us
+            if y_pos > 0:
+                # 如果有对应角速度，也显示
+                angular_velocity = curve_engine.angular_velocity(y_pos, *self.motion_units)  # 度/秒
+                self.pulse_info_label.setText(f"当前位置: X={x_pos}, Y={y_pos} (脉冲时间: {pulse_time:.1f}μs, 角速度: {angular_velocity:.2f}°/s)")
+            else:
+                self.pulse_info_label.setText(f"当前位置: X={x_pos}, Y={y_pos} (脉冲时间: {pulse_time:.1f}μs)")
+        
+        if self.pending_view is not None:
+            x0, x1 = self.pending_view
+            self.pending_view = None
+            self.set_view(x0, x1)
+        
+        if self.pending_brush is not None:
+            y_data = self.pending_brush
+            self.pending_brush = None
+            if self.brush_state is not None:
+                self.apply_brush(y_data)
+        
+        if self.pending_drag is None:
+            return
+        idx, new_y, y_data = self.pending_drag
+        self.pending_drag = None
+        if idx >= len(self.current_array):
+            return
+        
         # 直接赋值鼠标对应的Y值
-        old_value = self.current_array[idx]
-        self.current_array[idx] = new_y
+        self.set_point_value(idx, new_y)
         
         # 更新状态显示
         status_text = f"移动点: #{idx} 值为 {new_y} (鼠标Y={y_data:.1f})"
@@ -506,8 +1444,7 @@ class StepperCurveGenerator(QMainWindow):
         self.drag_status.setText(status_text)
         
         # 更新Y值输入框以匹配当前值
-        if hasattr(self, 'y_value_spin'):
-            self.y_value_spin.setValue(new_y)
+        self.y_value_spin.setValue(new_y)
         
         # 更新选中点信息
         self.update_point_info(idx, new_y)
@@ -526,6 +1463,18 @@ class StepperCurveGenerator(QMainWindow):
             self.drag_status.setText(f"{debug_info} - 点击位置不在图表区域内")
             self.drag_status.setStyleSheet("color: red; font-weight: bold;")
             return
+        
+        # 点击缩略图：把视图中心移到点击位置
+        if event.inaxes is self.overview_ax:
+            self.overview_dragging = True
+            self.center_view(event.xdata)
+            return
+        
+        # 右键或中键拖动平移视图
+        if event.button in (2, 3):
+            if self.plot_signature is not None:
+                self.pan_start = (event.x, self.ax.get_xlim())
+            return
             
         # 添加数据坐标调试信息
         debug_info += f" 数据({event.xdata:.1f}, {event.ydata:.1f})"
@@ -535,6 +1484,14 @@ class StepperCurveGenerator(QMainWindow):
         if len(self.current_array) == 0:
             self.drag_status.setText(f"{debug_info} - 无数据")
             return
+        
+        # 按下鼠标选点或开始笔刷都会重绘
+        self.perf.mark_input()
+        
+        # 笔刷模式：拖动时以按下的点为中心整体变形一段区域
+        if self.brush_check.isChecked() and event.xdata is not None:
+            self.start_brush(int(round(event.xdata)), event.ydata / 3)
+            return
             
         # 直接根据x坐标选择最近的点
         if event.xdata is not None:
@@ -565,7 +1522,11 @@ class StepperCurveGenerator(QMainWindow):
                 # 再限制在应用程序要求的6-98范围内
                 new_y = max(6, min(98, new_y))
                 
-                self.current_array[x_coord] = new_y
+                # 从按下到释放的整个拖动过程合并为一条撤销记录
+                self.history.begin()
+                self.set_point_value(x_coord, new_y)
+                self.pending_drag = None
+                self.last_drag_target = (x_coord, new_y)
                 status_text = f"选中并直接移动点 #{x_coord} 至Y={new_y}"
                 # 更新点的值
                 self.initial_y = new_y  # 更新初始值
@@ -595,6 +1556,26 @@ class StepperCurveGenerator(QMainWindow):
     
     def on_mouse_release(self, event):
         """鼠标释放事件处理"""
+        # 先应用尚未刷新的拖动结果
+        self.flush_pending_updates()
+        self.last_drag_target = None
+        
+        # 结束拖动手势，整个过程作为一条撤销记录
+        self.history.commit()
+        self.update_history_buttons()
+        
+        # 结束笔刷编辑，刷新总耗时等信息
+        if self.brush_state is not None:
+            self.brush_state = None
+            self.plot_array(self.current_array)
+            return
+        
+        # 结束平移或缩略图拖动
+        if self.pan_start is not None or self.overview_dragging:
+            self.pan_start = None
+            self.overview_dragging = False
+            return
+        
         if self.dragging and self.selected_point is not None:
             idx = self.selected_point
             status_text = f"修改完成: 点 #{idx} 的值从 {self.initial_y} 变为 {self.current_array[idx]}"
@@ -619,12 +1600,15 @@ class StepperCurveGenerator(QMainWindow):
         
         try:
             # 被选中的点
-            if event.artist == self.scatter_plot:
+            # 右键和中键用于平移视图，笔刷模式下不选择单个点
+            if event.mouseevent.button in (2, 3) or self.brush_check.isChecked():
+                return False
+            if event.artist == self.scatter_plot and self.marker_offset is not None:
                 # 获取被拾取的点的索引
                 ind = event.ind
                 if len(ind) > 0:
-                    # 取第一个点的索引
-                    x_coord = ind[0]
+                    # 取第一个点的索引，散点只包含可见区间，需要加上区间起点
+                    x_coord = int(ind[0]) + self.marker_offset
                     
                     # 获取鼠标坐标
                     mouse_event = event.mouseevent
@@ -659,7 +1643,8 @@ class StepperCurveGenerator(QMainWindow):
                             # 再限制在应用程序要求的6-98范围内
                             new_y = max(6, min(98, new_y))
                             
-                            self.current_array[x_coord] = new_y
+                            self.history.begin()
+                            self.set_point_value(x_coord, new_y)
                             status_text = f"选中点 #{x_coord} 并直接移动至Y={new_y}"
                         else:
                             status_text = f"选中点 #{x_coord}, 值: {self.current_array[x_coord]}"
@@ -690,7 +1675,8 @@ class StepperCurveGenerator(QMainWindow):
             QMessageBox.warning(self, "警告", f"X坐标 {x} 超出范围，最大值为 {len(self.current_array)-1}")
             return
             
-        # 模拟选择指定点
+        # 模拟选择指定点，不在当前视图内时先平移过去
+        self.ensure_visible(x)
         self.selected_point = x
         self.dragging = True
         
@@ -725,7 +1711,7 @@ class StepperCurveGenerator(QMainWindow):
         current_value = self.current_array[idx]
         
         # 更新数组
-        self.current_array[idx] = new_y
+        self.set_point_value(idx, new_y)
         
         # 更新状态
         status_text = f"直接修改: 点 #{idx} 的值从 {current_value} 变为 {new_y}"
@@ -744,6 +1730,8 @@ class StepperCurveGenerator(QMainWindow):
         self.dragging = False
         self.selected_point = None
         self.initial_y = None  # 重置初始值
+        self.pending_drag = None  # 丢弃尚未刷新的拖动结果
+        self.last_drag_target = None
         self.drag_status.setText("已重置选择状态")
         self.drag_status.setStyleSheet("color: black; font-weight: normal;")
         self.status_label.setText("生成了新的曲线")
@@ -762,6 +1750,11 @@ class StepperCurveGenerator(QMainWindow):
 
     def on_key_press(self, event):
         """键盘事件处理"""
+        # Home键恢复完整视图
+        if event.key == 'home' and self.full_view is not None:
+            self.set_view(*self.full_view)
+            return
+        
         if self.selected_point is None:
             return
             
@@ -792,7 +1785,7 @@ class StepperCurveGenerator(QMainWindow):
                 
         # 如果值有变化
         if new_value != current_value:
-            self.current_array[idx] = new_value
+            self.set_point_value(idx, new_value)
             
         # 更新Y值输入框以匹配当前值
         if hasattr(self, 'y_value_spin'):
@@ -806,6 +1799,9 @@ class StepperCurveGenerator(QMainWindow):
         # 更新选中点信息
         self.update_point_info(idx, new_value)
         
+        # 切换的点移出视图时跟随平移
+        self.ensure_visible(idx)
+        
         # 更新图表
         self.update_plot_for_drag(idx, new_value)
 
@@ -832,7 +1828,7 @@ class StepperCurveGenerator(QMainWindow):
         # 如果值有变化
         if new_value != current_value:
             # 更新数组
-            self.current_array[idx] = new_value
+            self.set_point_value(idx, new_value)
             
             # 更新Y值输入框
             if hasattr(self, 'y_value_spin'):
@@ -855,22 +1851,20 @@ class StepperCurveGenerator(QMainWindow):
             self.point_info_area.setText("未选中有效点")
             return
             
-        # 计算角速度
-        step_angle = 1.8  # 度
-        pulse_time = value  # 脉冲时间(us)
-        angular_velocity = step_angle / (pulse_time/1000)  # 度/秒
+        # 脉冲时间(us)、角速度和在此速度下旋转一圈所需时间，按界面设置的定时器和电机参数换算
+        pulse_time = value * self.motion_units[1]
+        angular_velocity = float(curve_engine.angular_velocity(value, *self.motion_units))  # 度/秒
+        full_circle_time = float(curve_engine.full_circle_time(value, *self.motion_units))  # ms
         
-        # 单个脉冲时间
-        single_pulse_time = 5  # 假设每个脉冲间隔是5us
-        
-        # 计算在此速度下旋转一圈所需时间
-        full_circle_time = (360 / step_angle) * pulse_time / 1000  # ms
+        # 走到此点的累计耗时
+        elapsed_time = self.get_elapsed_time(idx) / 1000  # ms
         
         # 构建详细信息文本
         info_text = f"<b>点 #{idx}</b> 信息:<br>"
-        info_text += f"脉冲时间: <b style='color:blue'>{pulse_time} μs</b> | "
+        info_text += f"脉冲时间: <b style='color:blue'>{value} ({pulse_time:.1f} μs)</b> | "
         info_text += f"角速度: <b style='color:red'>{angular_velocity:.2f} °/s</b> | "
-        info_text += f"旋转一圈耗时: <b>{full_circle_time:.2f} ms</b>"
+        info_text += f"旋转一圈耗时: <b>{full_circle_time:.2f} ms</b> | "
+        info_text += f"累计耗时: <b>{elapsed_time:.2f} ms</b>"
         
         # 更新信息显示区域
         self.point_info_area.setText(info_text)
@@ -885,9 +1879,12 @@ class StepperCurveGenerator(QMainWindow):
         else:
             self.power_value.setEnabled(False)
             
-        # 所有曲线类型都可以使用起始段和末尾段设置
-        self.start_size.setEnabled(True)
-        self.end_size.setEnabled(True)
+        # 运动学曲线由加速度限制决定形状，不使用生效范围和起始/末尾段设置
+        physical = curve_type in motion_profile.PROFILE_TYPES
+        for widget in (self.range_start, self.range_end, self.start_size, self.end_size):
+            widget.setEnabled(not physical)
+        self.max_accel.setEnabled(physical)
+        self.max_jerk.setEnabled(curve_type == motion_profile.JERK_LIMITED)
         
         # 当曲线类型改变时，更新状态栏提示
         tips = {
@@ -896,204 +1893,643 @@ class StepperCurveGenerator(QMainWindow):
             "S型": "S型曲线: 三次曲线，起始和结束更平滑，适合大多数场景",
             "余弦": "余弦曲线: 基于余弦函数的平滑过渡，非常平滑的加减速",
             "抛物线": "抛物线: 二次曲线，加减速度逐渐变化，中间段减速明显",
-            "自定义幂函数": f"幂函数: 自定义幂指数({self.power_value.value()})，可精确控制加减速特性"
+            "自定义幂函数": f"幂函数: 自定义幂指数({self.power_value.value()})，可精确控制加减速特性",
+            motion_profile.TRAPEZOID: "梯形曲线: 恒定加速度，从起始速度加速到目标速度后匀速",
+            motion_profile.JERK_LIMITED: "S型曲线: 同时限制加速度和加加速度，加速度连续变化，冲击最小"
         }
         
         self.status_label.setText(tips.get(curve_type, "选择曲线类型"))
 
+    def update_region_controls(self):
+        """根据区域操作类型切换数值输入框和曲线类型下拉框"""
+        operation = self.region_operation.currentText()
+        self.region_amount.setEnabled(operation != region_edit.REFIT)
+        self.region_curve_type.setEnabled(operation == region_edit.REFIT)
+        if operation == region_edit.SCALE:
+            self.region_amount.setValue(1.0)
+        elif operation in (region_edit.GAUSSIAN, region_edit.OFFSET):
+            self.region_amount.setValue(10)
+    
+    def use_view_as_region(self):
+        """把当前视图内的点设为编辑区域"""
+        if self.plot_signature is None:
+            return
+        lo, hi = plot_lod.visible_window(self.ax.get_xlim(), len(self.current_array))
+        self.region_start.setValue(lo)
+        self.region_end.setValue(max(lo, hi - 1))
+    
+    def value_limits(self):
+        """编辑结果允许的取值范围：VALUE_MIN-VALUE_MAX，表中已有超出该范围的值时放宽到表本身的范围"""
+        if len(self.current_array) == 0:
+            return VALUE_MIN, VALUE_MAX
+        return (min(VALUE_MIN, int(self.current_array.min())),
+                max(VALUE_MAX, int(self.current_array.max())))
+    
+    def clip_values(self, values, limits):
+        """变形结果四舍五入并限制在limits范围内"""
+        return np.clip(np.rint(values), *limits).astype(np.int64)
+    
+    def apply_region_operation(self):
+        """对选定区域做一次向量化变形，整个操作作为一条撤销记录"""
+        if len(self.current_array) == 0:
+            QMessageBox.warning(self, "警告", "请先生成曲线再编辑区域。")
+            return
+        lo = self.region_start.value()
+        hi = self.region_end.value() + 1
+        if hi <= lo:
+            QMessageBox.warning(self, "警告", "区域起点不能大于终点")
+            return
+        
+        operation = self.region_operation.currentText()
+        try:
+            values = region_edit.apply_operation(operation, self.current_array[lo:hi],
+                                                 self.region_amount.value(),
+                                                 self.region_curve_type.currentText(),
+                                                 self.power_value.value(),
+                                                 self.max_accel.value(), self.max_jerk.value(),
+                                                 *self.motion_units)
+        except ValueError as e:
+            QMessageBox.warning(self, "警告", str(e))
+            return
+        
+        self.history.commit()
+        changed = self.set_region_values(lo, self.clip_values(values, self.value_limits()))
+        self.update_plot_slice(lo, hi)
+        self.status_label.setText(f"区域编辑: {operation} #{lo}-#{hi - 1}，修改了 {changed} 个点")
+    
+    def refresh_violations(self):
+        """重新检查约束，违规点在图上用红色叉号标出"""
+        if not self.violation_check.isChecked() or len(self.current_array) == 0:
+            self.violations = None
+            self.constraint_status.setText("")
+            return
+        found = constraints.find_violations(self.current_array, self.limit_accel.value(),
+                                            self.monotonic_check.isChecked(), *self.motion_units)
+        self.violations = np.union1d(*found.values())
+        summary = "，".join(f"{name} {len(idx)} 处" for name, idx in found.items() if len(idx))
+        if summary:
+            self.constraint_status.setText(f"违规: {summary}")
+            self.constraint_status.setStyleSheet("color: red;")
+        else:
+            self.constraint_status.setText("满足所有约束")
+            self.constraint_status.setStyleSheet("color: green;")
+    
+    def on_constraint_settings_changed(self):
+        """约束设置变化后重新检查并刷新标记"""
+        if self.plot_signature is not None:
+            self.plot_array(self.current_array)
+        else:
+            self.refresh_violations()
+    
+    def apply_constraints(self):
+        """对整张表做平滑、单调性修正和加速度限制，整个操作作为一条撤销记录"""
+        if len(self.current_array) == 0:
+            QMessageBox.warning(self, "警告", "请先生成曲线再修正。")
+            return
+        smooth_window = self.smooth_window.value() if self.smooth_check.isChecked() else 0
+        try:
+            values = constraints.enforce(self.current_array, self.limit_accel.value(),
+                                         self.monotonic_check.isChecked(), smooth_window,
+                                         value_range=self.value_limits(), step_angle=self.motion_units[0],
+                                         unit_us=self.motion_units[1])
+        except ValueError as e:
+            QMessageBox.warning(self, "警告", str(e))
+            return
+        
+        self.history.commit()
+        changed = self.set_region_values(0, values)
+        self.plot_array(self.current_array)
+        self.status_label.setText(f"约束修正: 修改了 {changed} 个点")
+    
+    def start_brush(self, idx, y_data):
+        """按下鼠标开始笔刷编辑，记录半径内的原始值"""
+        if not 0 <= idx < len(self.current_array):
+            return
+        radius = self.brush_radius.value()
+        lo = max(0, idx - radius)
+        hi = min(len(self.current_array), idx + radius + 1)
+        self.brush_state = (idx, lo, self.current_array[lo:hi].copy(), self.value_limits())
+        self.history.begin()
+        self.apply_brush(y_data)
+    
+    @perf_monitor.timed("brush")
+    def apply_brush(self, y_data):
+        """笔刷中心移到鼠标高度，周围的点按高斯权重跟随，总是相对按下时的原始值计算"""
+        idx, lo, base, limits = self.brush_state
+        target = max(limits[0], min(limits[1], int(round(y_data))))
+        values = region_edit.gaussian_bump(base, idx - lo, self.brush_radius.value(), target - base[idx - lo])
+        self.set_region_values(lo, self.clip_values(values, limits))
+        self.update_plot_slice(lo, lo + len(base))
+        status_text = f"笔刷: 点 #{idx} 移至 {target}，影响 #{lo}-#{lo + len(base) - 1}"
+        self.status_label.setText(status_text)
+        self.drag_status.setText(status_text)
+    
+    def update_plot_slice(self, lo, hi):
+        """区域修改后只更新受影响的区间：逐点显示时改写该段数据，抽稀显示时重新读取可见区间的包络"""
+        if self.plot_signature is None:
+            return
+        if self.line_offset is not None:
+            a = max(lo, self.line_offset)
+            b = min(hi, self.line_offset + len(self.line_plot.get_ydata()))
+            if a < b:
+                y_data = np.asarray(self.line_plot.get_ydata(), dtype=float).copy()
+                y_data[a - self.line_offset:b - self.line_offset] = self.current_array[a:b]
+                self.line_plot.set_ydata(y_data)
+                velocity = np.asarray(self.velocity_line.get_ydata(), dtype=float).copy()
+                velocity[a - self.line_offset:b - self.line_offset] = self.angular_velocity[a:b]
+                self.velocity_line.set_ydata(velocity)
+                if self.marker_offset is not None:
+                    offsets = self.scatter_plot.get_offsets()
+                    offsets[a - self.marker_offset:b - self.marker_offset, 1] = self.current_array[a:b]
+                    self.scatter_plot.set_offsets(offsets)
+        else:
+            self.update_view_data(self.current_array)
+        if self.violation_check.isChecked():
+            self.refresh_violations()
+            self.update_violation_markers(*plot_lod.visible_window(self.ax.get_xlim(), len(self.current_array)))
+        self.overview_line.set_data(*self.pulse_lod.envelope(0, len(self.current_array),
+                                                             self.overview_ax.bbox.width))
+        
+        if self.selected_point is not None and lo <= self.selected_point < hi:
+            self.update_highlight(self.selected_point, self.current_array[self.selected_point])
+        self.update_time_label(self.total_pulse, self.plot_signature[1])
+        self.canvas.draw_idle()
+        self.schedule_simulation()
+    
+    @perf_monitor.timed("drag")
     def update_plot_for_drag(self, idx, new_y):
         """更新曲线上拖动的点，而不重绘整个图形"""
         try:
-            # 更新脉冲时长曲线的Y值
-            y_data = self.line_plot.get_ydata()
-            y_data[idx] = new_y
-            self.line_plot.set_ydata(y_data)
-            
-            # 更新散点图数据
-            if self.scatter_plot is not None:
-                offsets = self.scatter_plot.get_offsets()
-                offsets[idx, 1] = new_y
-                self.scatter_plot.set_offsets(offsets)
+            # 拖动过程中使用缓存背景+局部图元的blit方式刷新，抽稀显示时只重绘拖动点所在的包络桶
+            if self.dragging:
+                self.blit_drag(idx, new_y)
+                return
             
-            # 更新高亮点
-            if self.highlight_point is not None:
-                self.highlight_point.remove()
-            self.highlight_point = self.ax.scatter([idx], [new_y], s=200, color='lime', 
-                                  edgecolor='white', linewidth=2, alpha=1.0, zorder=3)
+            # 重新生成可见区间的曲线和散点，只与可见点数有关
+            self.update_plot_data(self.current_array)
             
-            # 更新角速度曲线
-            step_angle = 1.8
-            angular_velocity = [step_angle / (t/1000) for t in self.current_array]
-            self.velocity_line.set_ydata(angular_velocity)
-            
-            # 更新数值标签
-            for txt in self.ax.texts:
-                txt.remove()
-            self.ax.annotate(f'{new_y}', xy=(idx, new_y), xytext=(0, 10), textcoords='offset points',
-                         ha='center', fontsize=9, fontweight='bold',
-                         bbox=dict(boxstyle='round,pad=0.3', fc='yellow', alpha=0.7))
+            # 更新高亮点和数值标签
+            self.update_highlight(idx, new_y)
             
             # 只刷新画布，不重绘整个图形
             self.canvas.draw_idle()
         except Exception as e:
             self.status_label.setText(f"更新图表错误: {str(e)}")
             # 如果动态更新失败，则回退到完全重绘
+            self.plot_signature = None
             self.plot_array(self.current_array)
     
-    def plot_array(self, arr):
-        """绘制数组曲线"""
-        # 完全清除图形
-        self.ax.clear()
-        self.figure.clf()  # 清除整个图形
-        self.ax = self.figure.add_subplot(111)  # 重新创建子图
-        
-        if not arr or len(arr) == 0:
-            self.canvas.draw()
+    def start_drag_blit(self, idx):
+        """开始拖动：缓存不含拖动点的静态背景，之后每次移动只重绘拖动点附近的图元
+
+        逐点显示时挖掉拖动点；抽稀显示时挖掉拖动点所在包络桶的两个顶点，
+        记下桶的下标范围和左右相邻的顶点，之后每帧只重算这一个桶的最小/最大值。
+        """
+        self.update_plot_data(self.current_array)
+        
+        # 在主曲线、散点和角速度曲线上挖掉拖动点（或其所在的桶），由动画图元单独绘制
+        x_data = np.asarray(self.line_plot.get_xdata())
+        y_data = np.asarray(self.line_plot.get_ydata(), dtype=float).copy()
+        self.drag_bin = None
+        if self.line_offset is not None:
+            cut = [idx - self.line_offset]
+        else:
+            vertex = 2 * int(np.searchsorted(x_data[1::2], idx))
+            cut = [vertex, vertex + 1]
+            if vertex + 1 < len(x_data):
+                left = (x_data[vertex - 1], y_data[vertex - 1]) if vertex > 0 else None
+                right = (x_data[vertex + 2], y_data[vertex + 2]) if vertex + 2 < len(x_data) else None
+                self.drag_bin = (int(x_data[vertex]), int(x_data[vertex + 1]), left, right)
+        cut = [pos for pos in cut if 0 <= pos < len(y_data)]
+        if cut:
+            y_data[cut] = np.nan
+            self.line_plot.set_ydata(y_data)
+            velocity = np.asarray(self.velocity_line.get_ydata(), dtype=float).copy()
+            velocity[cut] = np.nan
+            self.velocity_line.set_ydata(velocity)
+        if self.marker_offset is not None and 0 <= idx - self.marker_offset < len(self.scatter_plot.get_offsets()):
+            offsets = self.scatter_plot.get_offsets()
+            offsets[idx - self.marker_offset, 1] = np.nan
+            self.scatter_plot.set_offsets(offsets)
+        
+        for artist in self.drag_artists():
+            artist.set_animated(True)
+            artist.set_visible(True)
+        
+        # 动画图元不参与完整重绘，背景中只包含静态部分
+        self.canvas.draw()
+        self.drag_background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self.drag_index = idx
+    
+    def blit_drag(self, idx, new_y):
+        """恢复缓存背景，只重绘拖动点及其相邻线段"""
+        if self.drag_background is None or self.drag_index != idx:
+            self.start_drag_blit(idx)
+        
+        if self.drag_bin is None:
+            # 拖动点和左右相邻点组成的局部线段
+            lo = max(0, idx - 1)
+            hi = min(len(self.current_array), idx + 2)
+            x_local = np.arange(lo, hi)
+            y_local = self.current_array[lo:hi]
+            velocity_local = self.angular_velocity[lo:hi]
+        else:
+            # 重算拖动点所在包络桶的最小/最大值，与左右相邻的顶点连成局部线段
+            first, last, left, right = self.drag_bin
+            values = self.current_array[first:last + 1]
+            low, high = values.min(), values.max()
+            points = [(first, high), (last, low)] if values[0] > values[-1] else [(first, low), (last, high)]
+            points = [p for p in [left] + points + [right] if p is not None]
+            x_local, y_local = (np.array(axis, dtype=float) for axis in zip(*points))
+            velocity_local = curve_engine.angular_velocity(y_local, *self.motion_units)
+        
+        self.drag_line.set_data(x_local, y_local)
+        if self.marker_offset is not None and self.drag_bin is None:
+            self.drag_markers.set_offsets(np.column_stack([x_local, y_local]))
+        else:
+            self.drag_markers.set_offsets(np.empty((0, 2)))
+        self.drag_velocity_line.set_data(x_local, velocity_local)
+        self.update_highlight(idx, new_y)
+        
+        self.canvas.restore_region(self.drag_background)
+        for artist in self.drag_artists():
+            artist.axes.draw_artist(artist)
+        self.canvas.blit(self.figure.bbox)
+    
+    def stop_drag_blit(self):
+        """结束拖动的blit模式，动画图元恢复为普通图元"""
+        self.drag_background = None
+        self.drag_index = None
+        self.drag_bin = None
+        if self.drag_line is None:
             return
-            
-        # 获取x轴数据
-        x_data = list(range(len(arr)))
+        for artist in self.drag_artists():
+            artist.set_animated(False)
+        # 局部线段只在拖动时显示
+        self.drag_line.set_visible(False)
+        self.drag_markers.set_visible(False)
+        self.drag_velocity_line.set_visible(False)
+    
+    def drag_artists(self):
+        """拖动时需要逐帧重绘的图元（按绘制顺序）"""
+        return [self.drag_line, self.drag_markers, self.highlight_point,
+                self.value_annotation, self.drag_velocity_line]
+    
+    def on_canvas_resize(self, event):
+        """画布尺寸变化后缓存的背景失效，包络的分桶数随宽度变化"""
+        self.drag_background = None
+        if self.plot_signature is not None:
+            self.update_plot_data(self.current_array)
+    
+    def on_view_changed(self, ax):
+        """横坐标显示范围变化时重新抽稀可见区间"""
+        if self.plot_signature is not None:
+            self.update_view_data(self.current_array)
+    
+    def set_view(self, x0, x1):
+        """设置主图的横坐标显示范围，限制在完整范围以内，且至少显示MIN_VIEW_POINTS个点"""
+        if self.plot_signature is None:
+            return
+        full_start, full_end = self.full_view
+        width = min(max(x1 - x0, MIN_VIEW_POINTS), full_end - full_start)
+        x0 = min(max(x0, full_start), full_end - width)
+        
+        # 视图变化后拖动时缓存的背景失效
+        self.drag_background = None
+        self.ax.set_xlim(x0, x0 + width)
+        self.view_span.set_x(x0)
+        self.view_span.set_width(width)
+        self.canvas.draw_idle()
+    
+    def center_view(self, x):
+        """保持视图宽度，把视图中心移到x（下一帧生效）"""
+        x0, x1 = self.pending_view or self.ax.get_xlim()
+        half = (x1 - x0) / 2
+        self.pending_view = (x - half, x + half)
+        self.schedule_frame_update()
+    
+    def ensure_visible(self, idx):
+        """下标idx不在当前视图内时平移视图使其居中"""
+        if self.plot_signature is None:
+            return
+        x0, x1 = self.ax.get_xlim()
+        if not x0 <= idx <= x1:
+            half = (x1 - x0) / 2
+            self.set_view(idx - half, idx + half)
+    
+    def on_scroll(self, event):
+        """滚轮以鼠标位置为中心缩放横坐标，同一帧内的多次滚动累计后一次刷新"""
+        if self.plot_signature is None or event.inaxes not in (self.ax, self.velocity_ax):
+            return
+        factor = ZOOM_STEP if event.button == 'down' else 1 / ZOOM_STEP
+        x0, x1 = self.pending_view or self.ax.get_xlim()
+        center = event.xdata
+        self.pending_view = (center - (center - x0) * factor, center + (x1 - center) * factor)
+        self.perf.mark_input()
+        self.schedule_frame_update()
+    
+    def get_effect_range(self, n_points):
+        """返回生效范围的起止下标，未设置（全部生效）时返回None"""
+        if not hasattr(self, 'range_start') or not hasattr(self, 'range_end'):
+            return None
+        range_start_percent = self.range_start.value() / 100
+        range_end_percent = self.range_end.value() / 100
+        if range_start_percent > 0 or range_end_percent < 1:
+            return int(n_points * range_start_percent), int(n_points * range_end_percent)
+        return None
+    
+    def update_highlight(self, idx, value):
+        """移动高亮点和数值标签到选中点，idx为None时隐藏"""
+        if idx is None:
+            self.highlight_point.set_offsets(np.empty((0, 2)))
+            self.value_annotation.set_visible(False)
+            return
+        self.highlight_point.set_offsets([[idx, value]])
+        self.value_annotation.set_text(f'{value}')
+        self.value_annotation.xy = (idx, value)
+        self.value_annotation.set_visible(True)
+    
+    def build_plot(self, array_length, effect_range):
+        """重建坐标轴和所有图元，只在数组长度或生效范围变化时调用"""
+        self.stop_drag_blit()
         
-        # 计算角速度
-        step_angle = 1.8  # 度
-        angular_velocity = [step_angle / (t/1000) for t in arr]  # 转换为度/秒
+        # 完全清除图形，上方为主图，下方为全局缩略图
+        self.figure.clf()
+        grid = self.figure.add_gridspec(2, 1, height_ratios=[6, 1])
+        self.ax = self.figure.add_subplot(grid[0])
+        self.pending_view = None
         
         # 设置坐标轴范围，横坐标自适应数组长度，确保坐标与值直接对应
-        array_length = len(arr)
         x_margin = max(5, int(array_length * 0.05))  # 添加5%的边距，至少5个单位
-        self.ax.set_xlim(-x_margin, array_length + x_margin)  # 横坐标自适应数组长度，留出余量
+        self.full_view = (-x_margin, array_length + x_margin)
+        self.ax.set_xlim(*self.full_view)  # 横坐标自适应数组长度，留出余量
         self.ax.set_ylim(0, 105)  # 脉冲时长范围：0-105，留出余量
         
         # 设置刻度，确保值与位置一致
         self.ax.set_yticks(range(0, 105, 10))
         
-        # 绘制脉冲时长曲线
-        self.line_plot, = self.ax.plot(x_data, arr, '-', lw=1.5, color='blue', label='脉冲时长(us)', zorder=1)
+        # 脉冲时长曲线和可点击的散点图，只包含可见区间的数据，在update_plot_data中填充
+        self.line_plot, = self.ax.plot([], [], '-', lw=1.5, color='blue', label='脉冲时长(us)', zorder=1)
         
-        # 绘制可点击的散点图 - 使点更大更明显，大幅增加picker半径
-        self.scatter_plot = self.ax.scatter(x_data, arr, s=100, color='darkblue', 
+        # 使点更大更明显，大幅增加picker半径
+        self.scatter_plot = self.ax.scatter([], [], s=100, color='darkblue', 
                                      alpha=0.7, edgecolor='yellow', linewidth=1.5, 
                                      picker=20, zorder=2)
         
-        # 高亮选中的点
-        self.highlight_point = None
-        if self.selected_point is not None and 0 <= self.selected_point < len(arr):
-            self.highlight_point = self.ax.scatter([self.selected_point], [arr[self.selected_point]], 
-                       s=200, color='lime', edgecolor='white', linewidth=2,
-                       alpha=1.0, zorder=3)
-            
-            # 添加文本标签，显示选中点的值
-            self.ax.annotate(f'{arr[self.selected_point]}', 
-                         xy=(self.selected_point, arr[self.selected_point]),
-                         xytext=(0, 10), textcoords='offset points',
-                         ha='center', fontsize=9, fontweight='bold',
-                         bbox=dict(boxstyle='round,pad=0.3', fc='yellow', alpha=0.7))
+        # 违规点标记，只显示可见区间内的
+        self.violation_markers = self.ax.scatter([], [], marker='x', s=80, color='red', linewidths=2, zorder=4)
+        
+        # 选中点的高亮和数值标签，默认隐藏
+        self.highlight_point = self.ax.scatter([], [], s=200, color='lime', edgecolor='white',
+                                               linewidth=2, alpha=1.0, zorder=3)
+        self.value_annotation = self.ax.annotate('', xy=(0, 0), xytext=(0, 10), textcoords='offset points',
+                                                 ha='center', fontsize=9, fontweight='bold',
+                                                 bbox=dict(boxstyle='round,pad=0.3', fc='yellow', alpha=0.7))
+        self.value_annotation.set_visible(False)
+        
+        # 拖动时单独绘制的局部线段和散点，样式与主曲线一致
+        self.drag_line, = self.ax.plot([], [], '-', lw=1.5, color='blue', zorder=1, visible=False)
+        self.drag_markers = self.ax.scatter([], [], s=100, color='darkblue', alpha=0.7,
+                                            edgecolor='yellow', linewidth=1.5, zorder=2, visible=False)
         
         # 创建第二个y轴显示角速度
-        ax2 = self.ax.twinx()
-        self.velocity_line, = ax2.plot(x_data, angular_velocity, '-', lw=1, color='red', label='角速度(度/秒)', alpha=0.7)
+        self.velocity_ax = self.ax.twinx()
+        self.velocity_line, = self.velocity_ax.plot([], [], '-', lw=1, color='red', label='角速度(度/秒)', alpha=0.7)
         
-        # 设置角速度轴的范围 - 从0开始
-        ax2.set_ylim(0, 330)  # 角速度范围：0到330，让0点从X轴开始
+        # 角速度轴从0开始，上限在plot_array中按数组的最快速度设置
+        self.drag_velocity_line, = self.velocity_ax.plot([], [], '-', lw=1, color='red', alpha=0.7, visible=False)
         
         # 标记生效范围（如果已设置）
-        if hasattr(self, 'range_start') and hasattr(self, 'range_end'):
-            range_start_percent = self.range_start.value() / 100
-            range_end_percent = self.range_end.value() / 100
+        if effect_range is not None:
+            start_idx, end_idx = effect_range
             
-            if range_start_percent > 0 or range_end_percent < 1:
-                start_idx = int(len(arr) * range_start_percent)
-                end_idx = int(len(arr) * range_end_percent)
-                
-                # 添加竖直线标记生效范围
-                self.ax.axvline(x=start_idx, color='green', linestyle='--', alpha=0.7)
-                self.ax.axvline(x=end_idx, color='green', linestyle='--', alpha=0.7)
-                
-                # 添加标注
-                self.ax.text(start_idx, 105, "范围起点", color='green', fontsize=9,
-                         ha='center', va='top', rotation=90, alpha=0.7)
-                self.ax.text(end_idx, 105, "范围终点", color='green', fontsize=9,
-                         ha='center', va='top', rotation=90, alpha=0.7)
-                
-                # 填充生效范围区域
-                self.ax.axvspan(start_idx, end_idx, color='green', alpha=0.05)
+            # 添加竖直线标记生效范围
+            self.ax.axvline(x=start_idx, color='green', linestyle='--', alpha=0.7)
+            self.ax.axvline(x=end_idx, color='green', linestyle='--', alpha=0.7)
+            
+            # 添加标注
+            self.ax.text(start_idx, 105, "范围起点", color='green', fontsize=9,
+                     ha='center', va='top', rotation=90, alpha=0.7)
+            self.ax.text(end_idx, 105, "范围终点", color='green', fontsize=9,
+                     ha='center', va='top', rotation=90, alpha=0.7)
+            
+            # 填充生效范围区域
+            self.ax.axvspan(start_idx, end_idx, color='green', alpha=0.05)
         
         # 设置标题和标签
-        curve_type = self.curve_type.currentText() if hasattr(self, 'curve_type') else "未知类型"
-        self.ax.set_title(f"步进电机加减速曲线 - {curve_type}")
+        self.ax.set_title("步进电机加减速曲线")
         self.ax.set_xlabel("步数")
         self.ax.set_ylabel("脉冲时长(us)")
-        ax2.set_ylabel("角速度(度/秒)")
+        self.velocity_ax.set_ylabel("角速度(度/秒)")
         
         # 添加图例
         lines1, labels1 = self.ax.get_legend_handles_labels()
-        lines2, labels2 = ax2.get_legend_handles_labels()
+        lines2, labels2 = self.velocity_ax.get_legend_handles_labels()
         self.ax.legend(lines1 + lines2, labels1 + labels2, loc='upper right')
         
         # 添加网格线使图表更清晰
         self.ax.grid(True, linestyle='--', alpha=0.7)
         
-        # 确保图表响应鼠标事件
-        self.figure.canvas.mpl_disconnect('button_press_event')
-        self.figure.canvas.mpl_disconnect('button_release_event')
-        self.figure.canvas.mpl_disconnect('motion_notify_event')
-        self.figure.canvas.mpl_disconnect('pick_event')
-        self.figure.canvas.mpl_disconnect('key_press_event')
-        
-        # 启用交互模式
-        self.figure.canvas.setFocusPolicy(Qt.StrongFocus)
-        self.figure.canvas.setFocus()
-        
-        # 强制完全重绘
-        self.figure.tight_layout()  # 调整布局
-        self.canvas.draw()
-        self.canvas.flush_events()
+        # 缩略图显示完整曲线，矩形标出主图当前的显示范围
+        self.overview_ax = self.figure.add_subplot(grid[1])
+        self.overview_ax.set_xlim(*self.full_view)
+        self.overview_ax.set_ylim(0, 105)
+        self.overview_ax.set_yticks([])
+        self.overview_line, = self.overview_ax.plot([], [], '-', lw=1, color='blue')
+        self.view_span = Rectangle((self.full_view[0], 0), self.full_view[1] - self.full_view[0], 1,
+                                   transform=self.overview_ax.get_xaxis_transform(),
+                                   color='orange', alpha=0.3)
+        self.overview_ax.add_patch(self.view_span)
+        
+        # 调整布局
+        self.figure.tight_layout()
+        self.plot_signature = (array_length, effect_range)
+        self.ax.callbacks.connect('xlim_changed', self.on_view_changed)
+    
+    def update_plot_data(self, arr):
+        """数组数据变化后刷新主图的可见区间和缩略图"""
+        lod = self.pulse_lod if arr is self.current_array else plot_lod.MinMaxPyramid(arr)
+        self.update_view_data(arr, lod)
+        self.overview_line.set_data(*lod.envelope(0, len(arr), self.overview_ax.bbox.width))
+    
+    def update_view_data(self, arr, lod=None):
+        """把可见区间的数据写入主曲线、散点和角速度曲线
+
+        可见点数超过画布宽度的两倍时，曲线只画每个像素的最小/最大值包络，
+        包络从预先计算的金字塔中读取，耗时只与画布宽度有关；
+        可见点数不超过plot_lod.MARKER_LIMIT时才显示可点击的散点。
+        """
+        if lod is None:
+            lod = self.pulse_lod if arr is self.current_array else plot_lod.MinMaxPyramid(arr)
+        
+        lo, hi = plot_lod.visible_window(self.ax.get_xlim(), len(arr))
+        x_data, y_data = lod.envelope(lo, hi, self.ax.bbox.width)
+        self.line_plot.set_data(x_data, y_data)
+        # 角速度随脉冲时长单调递减，包络直接由脉冲时长的包络换算
+        self.velocity_line.set_data(x_data, curve_engine.angular_velocity(y_data, *self.motion_units))
+        # 没有抽稀时曲线上的点与下标一一对应
+        self.line_offset = lo if len(x_data) == hi - lo else None
+        
+        if hi - lo <= plot_lod.MARKER_LIMIT:
+            self.scatter_plot.set_offsets(np.column_stack([np.arange(lo, hi), arr[lo:hi]]))
+            self.marker_offset = lo
+        else:
+            self.scatter_plot.set_offsets(np.empty((0, 2)))
+            self.marker_offset = None
+        self.update_violation_markers(lo, hi)
+    
+    def update_violation_markers(self, lo, hi):
+        """把可见区间[lo, hi)内的违规点画成红色叉号，数量过多时只画前MARKER_LIMIT个"""
+        if self.violations is None:
+            self.violation_markers.set_offsets(np.empty((0, 2)))
+            return
+        a, b = np.searchsorted(self.violations, [lo, hi])
+        idx = self.violations[a:min(b, a + plot_lod.MARKER_LIMIT)]
+        self.violation_markers.set_offsets(np.column_stack([idx, self.current_array[idx]]))
+    
+    @perf_monitor.timed("plot")
+    def plot_array(self, arr):
+        """绘制数组曲线
+
+        坐标轴和图元只在数组长度或生效范围变化时重建，其余情况只更新数据后增量刷新。
+        """
+        if arr is None or len(arr) == 0:
+            self.stop_drag_blit()
+            self.figure.clf()
+            self.ax = self.figure.add_subplot(111)
+            self.plot_signature = None
+            self.canvas.draw_idle()
+            return
         
-        # 重新连接鼠标事件（因为figure.clf()会清除所有事件连接）
-        self.cidpress = self.canvas.mpl_connect('button_press_event', self.on_mouse_press)
-        self.cidrelease = self.canvas.mpl_connect('button_release_event', self.on_mouse_release)
-        self.cidmotion = self.canvas.mpl_connect('motion_notify_event', self.on_mouse_move)
-        self.cidpick = self.canvas.mpl_connect('pick_event', self.on_pick)
-        self.cidkey = self.canvas.mpl_connect('key_press_event', self.on_key_press)
+        effect_range = self.get_effect_range(len(arr))
+        self.refresh_violations()
+        if self.plot_signature != (len(arr), effect_range):
+            self.build_plot(len(arr), effect_range)
+        else:
+            self.stop_drag_blit()
+        
+        self.update_plot_data(arr)
+        
+        # 角速度轴上限按最短的脉冲时长（最快速度）留出10%余量，0点在X轴上
+        fastest = max(int(arr.min()), 1)
+        self.velocity_ax.set_ylim(0, float(curve_engine.angular_velocity(fastest, *self.motion_units)) * 1.1)
+        
+        # 高亮选中的点
+        if self.selected_point is not None and 0 <= self.selected_point < len(arr):
+            self.update_highlight(self.selected_point, arr[self.selected_point])
+        else:
+            self.update_highlight(None, None)
+        
+        curve_type = self.curve_type.currentText() if hasattr(self, 'curve_type') else "未知类型"
+        self.ax.set_title(f"步进电机加减速曲线 - {curve_type}")
+        
+        # 保持画布焦点，方便键盘操作
+        self.canvas.setFocus()
+        self.canvas.draw_idle()
         
         # 计算总耗时
-        total_time = sum(arr) * 5  # 假设每个脉冲间隔是5us
+        total_pulse = self.total_pulse if arr is self.current_array else int(np.sum(arr))
+        self.update_time_label(total_pulse, effect_range)
+        self.schedule_simulation()
+    
+    def update_time_label(self, total_pulse, effect_range):
+        """更新总耗时显示，包含生效范围信息"""
+        total_time = total_pulse * self.motion_units[1]
         
         # 更新总耗时显示，包含生效范围信息
-        if hasattr(self, 'range_start') and hasattr(self, 'range_end'):
-            range_start_percent = self.range_start.value() / 100
-            range_end_percent = self.range_end.value() / 100
+        if effect_range is not None:
+            start_idx, end_idx = effect_range
+            effect_points = end_idx - start_idx
             
-            if range_start_percent > 0 or range_end_percent < 1:
-                start_idx = int(len(arr) * range_start_percent)
-                end_idx = int(len(arr) * range_end_percent)
-                effect_points = end_idx - start_idx
-                
-                # 添加生效范围信息
-                range_info = f" | 生效范围: {start_idx}-{end_idx} (共{effect_points}点)"
-                self.time_cost_label.setText(f"总耗时: {total_time/1000:.2f} ms{range_info}")
-            else:
-                self.time_cost_label.setText(f"总耗时: {total_time/1000:.2f} ms | 生效范围: 全部")
+            # 添加生效范围信息
+            range_info = f" | 生效范围: {start_idx}-{end_idx} (共{effect_points}点)"
+            self.time_cost_label.setText(f"总耗时: {total_time/1000:.2f} ms{range_info}")
+        elif hasattr(self, 'range_start') and hasattr(self, 'range_end'):
+            self.time_cost_label.setText(f"总耗时: {total_time/1000:.2f} ms | 生效范围: 全部")
         else:
             self.time_cost_label.setText(f"总耗时: {total_time/1000:.2f} ms")
 
     def export_array(self):
         """导出为C数组格式"""
-        if not self.current_array:
+        if len(self.current_array) == 0:
             QMessageBox.warning(self, "警告", "没有可导出的数组！")
             return
+        if len(self.current_array) > EXPORT_TEXT_LIMIT:
+            self.export_array_file()
+            return
             
-        array_name = "GeneratedCurve"
-        s = f"int {array_name}[{len(self.current_array)}] = {{\n"
-        for i, v in enumerate(self.current_array):
-            s += f"{v},"
-            if (i+1) % 10 == 0:
-                s += "\n"
-        s = s.rstrip(',\n') + "\n};"
+        try:
+            s = c_array.format_c_array(self.current_array, self.get_export_name(),
+                                       self.export_per_line.value(), self.get_export_ctype(),
+                                       self.export_const.isChecked(),
+                                       self.export_attributes.currentText().strip())
+        except ValueError as e:
+            QMessageBox.warning(self, "警告", str(e))
+            return
         
         self.array_input.setText(s)
         QMessageBox.information(self, "成功", "数组已导出！")
 
+    def export_array_file(self):
+        """长数组逐块写入C文件，文本框不需要容纳几十MB的文本"""
+        path, _ = QFileDialog.getSaveFileName(self, f"导出C数组（超过{EXPORT_TEXT_LIMIT}点，直接写入文件）",
+                                              self.get_export_name() + ".h", "C头文件 (*.h);;C源文件 (*.c)")
+        if not path:
+            return
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                c_array.write_c_array(f, self.current_array, self.get_export_name(),
+                                      self.export_per_line.value(), self.get_export_ctype(),
+                                      self.export_const.isChecked(),
+                                      self.export_attributes.currentText().strip())
+                f.write("\n")
+        except (ValueError, OSError) as e:
+            QMessageBox.warning(self, "警告", str(e))
+            return
+        QMessageBox.information(self, "成功", f"{len(self.current_array)}个点已导出到 {path}")
+
+    def get_export_name(self):
+        """导出使用的数组名称"""
+        return self.export_name.text().strip() or "GeneratedCurve"
+    
+    def get_export_ctype(self):
+        """导出使用的元素类型，"auto"表示自动选择最小类型"""
+        ctype = self.export_ctype.currentText()
+        return "auto" if ctype == "自动(最小类型)" else ctype
+    
+    def export_header(self):
+        """把文本框中所有具名数组和当前曲线合并导出为一个去重的头文件"""
+        profiles = {}
+        try:
+            for arr in c_array.parse_c_arrays(self.array_input.toPlainText()):
+                if arr.name and len(arr.values) > 0:
+                    profiles[arr.name] = arr.values
+        except ValueError as e:
+            QMessageBox.warning(self, "警告", f"无法解析文本框中的数组: {e}")
+            return
+        # 当前曲线按导出名称加入（同名时覆盖文本框中的旧数据）
+        if len(self.current_array) > 0:
+            profiles[self.get_export_name()] = self.current_array
+        if not profiles:
+            QMessageBox.warning(self, "警告", "没有可导出的数组！")
+            return
+        
+        path, _ = QFileDialog.getSaveFileName(self, "批量导出头文件", "profiles.h", "C头文件 (*.h)")
+        if not path:
+            return
+        guard = re.sub(r'\W', '_', os.path.basename(path)).upper()
+        try:
+            text = c_array.format_profile_header(list(profiles.items()), "ProfilePool", self.get_export_ctype(),
+                                                 self.export_const.isChecked(),
+                                                 self.export_attributes.currentText().strip(),
+                                                 self.export_per_line.value(), guard)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        except (ValueError, OSError) as e:
+            QMessageBox.warning(self, "警告", str(e))
+            return
+        QMessageBox.information(self, "成功", f"已导出{len(profiles)}条曲线到 {path}")
+
 if __name__ == '__main__':
     app = QApplication(sys.argv)
     window = StepperCurveGenerator()